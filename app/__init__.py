@@ -1,26 +1,47 @@
+import hmac
+import os
 from flask_api import FlaskAPI
 from flask_sqlalchemy import SQLAlchemy
 from flasgger import Swagger
-from flask import make_response, jsonify, abort
+from flask import make_response, jsonify, abort, request
 
 
 # local import
 from config import app_config
+from app.helpers.token_cache import verified_tokens
+from app.helpers.hashing import bcrypt, hashing_pool, HashingPoolSaturated
 
 # initialize sql-alchemy
 db = SQLAlchemy()
 base_url = '/yummy_api/v1'
+base_url_v2 = '/yummy_api/v2'
 
 
 def make_app(config_name):
     from app.models import Categories
     from app.classes import categories
+    from app.helpers.response_cache import response_cache, make_backend
+    from app.helpers.search_index import search_index
+    from app.helpers.pantry_index import pantry_index
 
     app = FlaskAPI(__name__, instance_relative_config=True)
 
-    app.config.from_object(app_config['testing'])
+    app.config.from_object(app_config[config_name or 'development'])
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     db.init_app(app)
+    verified_tokens.configure(app.config['TOKEN_CACHE_SIZE'],
+                              app.config['TOKEN_CACHE_MAX_AGE'])
+    bcrypt.init_app(app)
+    response_cache.configure(make_backend(app.config), app.config['RESPONSE_CACHE_TTL'])
+    search_index.configure(app.config['SEARCH_BACKEND'] == 'memory',
+                           app.config['SEARCH_INDEX_USERS'])
+    if search_index.enabled and app.config['SEARCH_INDEX_SNAPSHOT'] and \
+            os.path.exists(app.config['SEARCH_INDEX_SNAPSHOT']):
+        search_index.restore(app.config['SEARCH_INDEX_SNAPSHOT'])
+    pantry_index.configure(app.config['PANTRY_INDEX_USERS'])
+    hashing_pool.configure(app.config['BCRYPT_POOL_WORKERS'],
+                           app.config['BCRYPT_POOL_QUEUE_SIZE'],
+                           app.config['BCRYPT_POOL_RETRY_AFTER'])
     app.config['SWAGGER'] = {"swagger": "2.0",
                              "title": "Yummy Recipes",
                              "info": {
@@ -47,29 +68,75 @@ def make_app(config_name):
                              ],}
                              
     Swagger(app)
-    from app.classes.categories import category_view_post, category_manipulation, category_view_search
-    app.add_url_rule(base_url + '/categories/', view_func=category_view_post)
-    app.add_url_rule(base_url + '/categories/<int:id>',
-                     view_func=category_manipulation)
-    app.add_url_rule(base_url + '/categories/search/',
-                     view_func=category_view_search)
-
-    from app.classes.recipes import recipe_post_get_view, recipe_manipulation_view, recipe_search_view
-    app.add_url_rule(base_url + '/categories/<int:id>/recipes/',
-                     view_func=recipe_post_get_view)
-    app.add_url_rule(base_url + '/categories/<int:id>/recipes/<int:recipe_id>',
-                     view_func=recipe_manipulation_view)
-    app.add_url_rule(
-        base_url + '/categories/<int:id>/recipes/search/', view_func=recipe_search_view)
-
+    from app.classes.categories import category_view_post, category_manipulation, category_view_search, \
+        category_bulk_view
+    from app.classes.recipes import recipe_post_get_view, recipe_manipulation_view, recipe_search_view, \
+        recipe_bulk_view, recipe_ingredients_view, recipe_pantry_view, \
+        recipe_search_all_view
+    from app.classes.export import export_view, import_view
     from app.auth.authentication import user_registration_view, user_login_view, user_password_reset_view, user_logout_view
-    app.add_url_rule(base_url + '/auth/register',
-                     view_func=user_registration_view, methods=['POST'])
-    app.add_url_rule(base_url + '/auth/login',
-                     view_func=user_login_view, methods=['POST'])
-    app.add_url_rule(base_url + '/auth/password-reset',
-                     view_func=user_password_reset_view, )
-    app.add_url_rule(base_url + '/auth/logout', view_func=user_logout_view)
+    # v2 serves the same views, with list responses wrapped in a page envelope
+    for api_url in (base_url, base_url_v2):
+        app.add_url_rule(api_url + '/categories/', view_func=category_view_post)
+        app.add_url_rule(api_url + '/categories/<int:id>',
+                         view_func=category_manipulation)
+        app.add_url_rule(api_url + '/categories/search/',
+                         view_func=category_view_search)
+        app.add_url_rule(api_url + '/categories/bulk',
+                         view_func=category_bulk_view)
+
+        app.add_url_rule(api_url + '/categories/<int:id>/recipes/',
+                         view_func=recipe_post_get_view)
+        app.add_url_rule(api_url + '/categories/<int:id>/recipes/<int:recipe_id>',
+                         view_func=recipe_manipulation_view)
+        app.add_url_rule(
+            api_url + '/categories/<int:id>/recipes/search/', view_func=recipe_search_view)
+        app.add_url_rule(api_url + '/categories/<int:id>/recipes/bulk',
+                         view_func=recipe_bulk_view)
+        app.add_url_rule(api_url + '/recipes/search/',
+                         view_func=recipe_search_all_view)
+        app.add_url_rule(api_url + '/recipes/ingredients/',
+                         view_func=recipe_ingredients_view)
+        app.add_url_rule(api_url + '/recipes/pantry/',
+                         view_func=recipe_pantry_view)
+
+        app.add_url_rule(api_url + '/export', view_func=export_view)
+        app.add_url_rule(api_url + '/import', view_func=import_view)
+
+        app.add_url_rule(api_url + '/auth/register',
+                         view_func=user_registration_view, methods=['POST'])
+        app.add_url_rule(api_url + '/auth/login',
+                         view_func=user_login_view, methods=['POST'])
+        app.add_url_rule(api_url + '/auth/password-reset',
+                         view_func=user_password_reset_view, )
+        app.add_url_rule(api_url + '/auth/logout', view_func=user_logout_view)
+
+    @app.route(base_url + '/metrics')
+    def metrics():
+        """reports the in-process cache statistics of this worker to the
+        holder of the metrics token
+        """
+        metrics_token = app.config['METRICS_TOKEN']
+        if not metrics_token:
+            abort(404)
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), metrics_token):
+            return make_response(jsonify({'message': 'Metrics token not valid'})), 401
+        response = {
+            'token_cache': verified_tokens.stats(),
+            'hashing_pool': hashing_pool.stats(),
+            'response_cache': response_cache.stats(),
+            'search_index': search_index.stats(),
+            'pantry_index': pantry_index.stats()
+        }
+        return make_response(jsonify(response)), 200
+
+    @app.errorhandler(HashingPoolSaturated)
+    def hashing_pool_saturated(error):
+        """handles password hashing requests refused while the hashing pool is full
+        """
+        response = make_response(jsonify({'message': str(error)}), 503)
+        response.headers['Retry-After'] = str(error.retry_after)
+        return response
 
     @app.errorhandler(404)
     def not_found(error):
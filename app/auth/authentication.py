@@ -1,10 +1,10 @@
 """Class to deal with user authenticatication
 """
 from app.helpers.decorators import token_required
-from app.models import User, Sessions
+from app.helpers.hashing import HashingPoolSaturated
+from app.models import User
 from flask import request, jsonify, make_response
 from flask.views import MethodView
-from app import db
 from app.helpers.auth_validators import user_registration_validation, \
     user_login_validation, password_reset_validation
 
@@ -66,12 +66,16 @@ class RegisterUser(MethodView):
                     response = {'message': "Successfully registered"}
                     return make_response(jsonify(response)), 201
 
+                except HashingPoolSaturated:
+                    raise
                 except Exception as e:
                     response = {'message': str(e)}
                     return make_response(jsonify(response)), 400
             else:
                 response = {'message': "User Exists, Kindly Login"}
                 return make_response(jsonify(response)), 409
+        except HashingPoolSaturated:
+            raise
         except Exception:
             response = {"messsage": "Error occurred on creating User"}
             return make_response(jsonify(response)), 400
@@ -118,7 +122,13 @@ class LoginUser(MethodView):
             user_login_validation(email, password)
 
             if user_details and user_details.password_check(password):
-                access_token = user_details.user_token_generator(user_details.id)
+                # move the stored hash to the configured bcrypt cost while
+                # the plain password is at hand
+                if user_details.password_needs_rehash():
+                    user_details.password = User.password_hash(password)
+                    user_details.save()
+                access_token = user_details.user_token_generator(
+                    user_details.id, user_details.token_version)
 
                 if access_token:
                     response = {
@@ -132,6 +142,8 @@ class LoginUser(MethodView):
                     'message': 'Invalid Login Details'
                 }
                 return make_response(jsonify(response)), 401
+        except HashingPoolSaturated:
+            raise
         except Exception as e:
             response = {'message': 'Error occurred on user login'}
             return make_response(jsonify(response)), 400
@@ -187,7 +199,9 @@ class ResetUserPassword(MethodView):
             if user_details and user_details.secret_word_check(secret_word):
                 res_password = User.password_hash(reset_password)
                 user_details.password = res_password
-                user_details.save()
+                if user_details.secret_word_needs_rehash():
+                    user_details.secret_word = User.password_hash(secret_word)
+                user_details.revoke_tokens()
                 response = jsonify({'id': user_details.id,
                                     'email': user_details.email,
                                     'status': 'success',
@@ -196,6 +210,8 @@ class ResetUserPassword(MethodView):
             else:
                 response = {"message": "Kindly provide correct email and secret word"}
                 return make_response(jsonify(response)), 404
+        except HashingPoolSaturated:
+            raise
         except Exception as e:
             response = {'message': str(e)}
             return make_response(jsonify(response)), 400
@@ -228,10 +244,7 @@ class LogoutUser(MethodView):
             description: Bad Request
 
         """
-        access_token = request.headers.get('Authorization')
-        disable_token = Sessions(auth_token=access_token)
-        db.session.add(disable_token)
-        db.session.commit()
+        current_user.revoke_tokens()
         response = jsonify({
             "message": "You logged out successfully.",
             "status": "success"
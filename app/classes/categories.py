@@ -2,9 +2,22 @@
 """
 from app.helpers.decorators import token_required
 from app.models import Categories
-from flask import request, jsonify, make_response
+from flask import request, jsonify, make_response, current_app
 from flask.views import MethodView
 from app.helpers.category_validators import category_validation
+from app.helpers.bulk_validators import bulk_selection
+from app.helpers.embed import selected_embeds, embed_limit, embed_recipes
+from app.helpers.pagination import paginate_items, paginate_ids
+from app.helpers.search_index import search_index
+from app.helpers.envelope import wants_envelope, envelope_response, vary_on_accept
+from app.helpers.response_cache import cached_response
+from app.helpers.conditional import (
+    row_etag, embedded_etag, not_modified, precondition_failed, collection_etag)
+from app.helpers.fields import CATEGORY_FIELDS, CATEGORY_LIST_FIELDS, selected_fields, \
+    project, serialize
+from marshmallow import ValidationError
+from sqlalchemy.orm.exc import StaleDataError
+from app import db
 
 
 class Category(MethodView):
@@ -93,6 +106,8 @@ class Category(MethodView):
             response = {'message': str(e)}
             return make_response(jsonify(response)), 400
 
+    @vary_on_accept
+    @cached_response
     def get(self, current_user):
         """Method to get all categories of a user in a paginated way
         ---
@@ -104,6 +119,22 @@ class Category(MethodView):
           - TokenHeader: []
         parameter:
           - in: path
+          - in: query
+            name: after
+            description: Cursor of the next page, leave empty for the first page of cursor results
+            type: string
+          - in: query
+            name: fields
+            description: Comma separated fields to return, e.g. id,category_name
+            type: string
+          - in: query
+            name: embed
+            description: recipes, to include the first recipes of each category
+            type: string
+          - in: query
+            name: embed_limit
+            description: Number of recipes embedded per category
+            type: integer
         responses:
           200:
             schema:
@@ -138,29 +169,41 @@ class Category(MethodView):
         page = request.args.get('page', default=1, type=int)
 
         limit = request.args.get('limit', default=10, type=int)
+        cursor = request.args.get('after')
 
-        categories = Categories.get_all_user_categories(
-            current_user.id).paginate(page, limit, error_out=False)
-        results = []
-        for category in categories.items:
-
-            category_object = {
-                'id': category.id,
-                'category_name': category.category_name,
-                'date_created': category.date_created,
-                'date_modified': category.date_modified,
-                'previous_page': categories.prev_num,
-                'next_Page': categories.next_num
-
-            }
-
-            results.append(category_object)
+        etag = collection_etag(current_user.id)
+        response = not_modified(etag)
+        if response:
+            return response
+        try:
+            fields = selected_fields(request.args.get('fields'),
+                                     CATEGORY_LIST_FIELDS, CATEGORY_FIELDS)
+            embeds = selected_embeds(request.args.get('embed'))
+            recipe_limit = embed_limit(request.args.get('embed_limit'),
+                                       current_app.config['EMBED_LIMIT_MAX'])
+            query = project(Categories.get_all_user_categories(current_user.id),
+                            Categories, fields)
+            total = None if cursor is not None else Categories.count_user_categories(
+                current_user.id)
+            categories, page_details = paginate_items(
+                query, Categories.id, page, limit, cursor, total)
+        except ValidationError as e:
+            response = {'message': str(e)}
+            return make_response(jsonify(response)), 400
+        results = [serialize(category, fields) for category in categories]
+        if 'recipes' in embeds:
+            embed_recipes(categories, results, recipe_limit)
+        if wants_envelope():
+            return envelope_response(results, page_details, etag)
+        for category_object in results:
+            category_object.update(page_details)
         if len(results) <= 0:
             response = {'message': 'No  category found '}
             response = make_response(jsonify(response)), 404
             return response
         response = jsonify(results)
         response.status_code = 200
+        response.set_etag(etag)
 
         return response
 
@@ -185,6 +228,18 @@ class ManipulateCategory(MethodView):
             required: true
             description: The ID of the category to retrieve
             type: string
+          - in: query
+            name: fields
+            description: Comma separated fields to return, e.g. id,category_name
+            type: string
+          - in: query
+            name: embed
+            description: recipes, to include the first recipes of the category
+            type: string
+          - in: query
+            name: embed_limit
+            description: Number of recipes embedded, follow recipes_next_cursor for the rest
+            type: integer
         security:
           - TokenHeader: []
         responses:
@@ -214,17 +269,32 @@ class ManipulateCategory(MethodView):
             description: OK
 
         """
-        category = Categories.query.filter_by(
-            id=id, created_by=current_user.id).first()
+        try:
+            fields = selected_fields(request.args.get('fields'), CATEGORY_FIELDS, CATEGORY_FIELDS)
+            embeds = selected_embeds(request.args.get('embed'))
+            recipe_limit = embed_limit(request.args.get('embed_limit'),
+                                       current_app.config['EMBED_LIMIT_MAX'])
+        except ValidationError as e:
+            response = {'message': str(e)}
+            return make_response(jsonify(response)), 400
+        category = project(Categories.query.filter_by(
+            id=id, created_by=current_user.id), Categories, fields,
+                           required=('id', 'version')).first()
         if category:
-            response = jsonify({
-                'id': category.id,
-                'category_name': category.category_name,
-                'created_by': category.created_by,
-                'date_created': category.date_created,
-                'date_modified': category.date_modified
-            })
+            # embedded recipes change without the category, so the ETag then
+            # follows every write of the user
+            etag = row_etag('category', category)
+            if embeds:
+                etag = embedded_etag(etag, current_user.id)
+            response = not_modified(etag)
+            if response:
+                return response
+            result = serialize(category, fields)
+            if 'recipes' in embeds:
+                embed_recipes([category], [result], recipe_limit)
+            response = jsonify(result)
             response.status_code = 200
+            response.set_etag(etag)
             return response
         else:
             response = {'message': 'No Category Found'}
@@ -255,6 +325,9 @@ class ManipulateCategory(MethodView):
                     category_name:
                      type: json
                      default: breakfast
+          - in: header
+            name: If-Match
+            description: ETag of the category being edited, the edit is refused if it changed since
         security:
           - TokenHeader: []
         responses:
@@ -282,6 +355,8 @@ class ManipulateCategory(MethodView):
             description: Bad Requests on category edit route
           404:
             description: Category does not exist
+          412:
+            description: Category was changed by another request
           200:
             description: OK
         """
@@ -296,6 +371,10 @@ class ManipulateCategory(MethodView):
                 response = {'message': 'Category does not exist'}
                 return make_response(jsonify(response)), 404
 
+            response = precondition_failed(row_etag('category', category))
+            if response:
+                return response
+
             category_details = Categories.query.filter_by(
                 category_name=category_name, created_by=current_user.id).first()
 
@@ -314,7 +393,13 @@ class ManipulateCategory(MethodView):
                 'date_modified': category.date_modified
             })
             response.status_code = 200
+            response.set_etag(row_etag('category', category))
             return response
+        except StaleDataError:
+            db.session.rollback()
+            response = {'message': 'Resource was changed by another request, fetch it again before editing',
+                        'status': 'fail'}
+            return make_response(jsonify(response)), 412
         except Exception as e:
             response = {'message': str(e)}
             return make_response(jsonify(response)), 400
@@ -368,6 +453,8 @@ class SearchCategory(MethodView):
     methods = ['GET']
     decorators = [token_required]
 
+    @vary_on_accept
+    @cached_response
     def get(self, current_user):
         """method to search categories of a particular user
         ---
@@ -381,6 +468,10 @@ class SearchCategory(MethodView):
             name: q
             description: Item to be searched
             type: string
+          - in: query
+            name: mode
+            description: contains (default) for names holding q, fuzzy for names similar to q, most similar first
+            type: string
           - in: page
             name: page
             description: Number of pages to return after a search
@@ -391,6 +482,14 @@ class SearchCategory(MethodView):
             description: Item to be searched
             type: int
             default: 10
+          - in: query
+            name: after
+            description: Cursor of the next page, leave empty for the first page of cursor results
+            type: string
+          - in: query
+            name: fields
+            description: Comma separated fields to return, e.g. id,category_name
+            type: string
 
         security:
           - TokenHeader: []
@@ -424,36 +523,117 @@ class SearchCategory(MethodView):
         search = request.args.get('q', '')
         page = request.args.get('page', default=1, type=int)
         limit = request.args.get('limit', default=10, type=int)
+        cursor = request.args.get('after')
+        mode = request.args.get('mode', 'contains')
 
+        if mode not in ('contains', 'fuzzy'):
+            response = {'message': 'Search mode not valid',
+                        'status': 'error'}
+            return make_response(jsonify(response)), 400
         if search:
-            categories = Categories.query.filter(Categories.category_name.ilike(
-                '%' + search + '%')).filter(Categories.created_by == current_user.id).paginate(
-                    per_page=limit, page=page, error_out=False)
+            etag = collection_etag(current_user.id)
+            response = not_modified(etag)
+            if response:
+                return response
+            in_memory = current_app.config['SEARCH_BACKEND'] == 'memory'
+            if mode == 'fuzzy':
+                if in_memory:
+                    response = {'message': 'Fuzzy search is not available',
+                                'status': 'error'}
+                    return make_response(jsonify(response)), 400
+                query, similarity = Categories.fuzzy_search(
+                    current_user.id, search, current_app.config['CATEGORY_SIMILARITY_THRESHOLD'])
+                if cursor is None:
+                    # cursor pages follow the id, numbered pages the closest name first
+                    query = query.order_by(similarity.desc(), Categories.id)
+            else:
+                query = Categories.query.filter(Categories.category_name.ilike(
+                    '%' + search + '%')).filter(Categories.created_by == current_user.id)
+            try:
+                fields = selected_fields(request.args.get('fields'),
+                                         CATEGORY_FIELDS, CATEGORY_FIELDS)
+                if in_memory:
+                    category_ids, page_details = paginate_ids(search_index.search_categories(
+                        current_user.id, search), page, limit, cursor)
+                    categories = project(Categories.query.filter(
+                        Categories.id.in_(category_ids)), Categories, fields).all() \
+                        if category_ids else []
+                    categories.sort(key=lambda category: category_ids.index(category.id))
+                else:
+                    categories, page_details = paginate_items(
+                        project(query, Categories, fields), Categories.id, page, limit, cursor)
+            except ValidationError as e:
+                response = {'message': str(e)}
+                return make_response(jsonify(response)), 400
 
+            results = [serialize(category, fields) for category in categories]
+            if wants_envelope():
+                return envelope_response(results, page_details, etag)
             if not categories:
                 response = {'message': 'No  category found '}
                 response = make_response(jsonify(response)), 200
                 return response
             else:
-                results = []
-                for category in categories.items:
-                    category_object = {
-                        'id': category.id,
-                        'category_name': category.category_name,
-                        'created_by': category.created_by,
-                        'date_created': category.date_created,
-                        'date_modified': category.date_modified,
-                        'previous_page': categories.prev_num,
-                        'next_Page': categories.next_num
-                    }
-                    results.append(category_object)
-                return make_response(jsonify(results)), 200
+                for category_object in results:
+                    category_object.update(page_details)
+                response = make_response(jsonify(results), 200)
+                response.set_etag(etag)
+                return response
         else:
             response = {'message': 'No search item provided',
                         'status': 'error'}
             return make_response(jsonify(response)), 200
 
 
+class BulkCategories(MethodView):
+    """Class to delete many categories of a user in one request
+    """
+    methods = ['DELETE']
+    decorators = [token_required]
+
+    def delete(self, current_user):
+        """Method to delete the categories picked by id or by name, with their recipes
+        ---
+        tags:
+            - Categories
+        produces:
+            - application/json
+        summary: delete many categories at once
+        parameters:
+          - in: body
+            name: selection
+            required: true
+            description: Either a list of category ids or a search term q
+            schema:
+              id: bulk_selection
+              properties:
+                    ids:
+                     type: array
+                     items:
+                       type: integer
+                    q:
+                     type: string
+        security:
+          - TokenHeader: []
+        responses:
+          200:
+            description: Ids of the deleted categories
+          400:
+            description: Selection is not valid
+        """
+        try:
+            ids, search = bulk_selection(request.data, current_app.config['BULK_IDS_MAX'])
+        except ValidationError as e:
+            response = {'message': str(e), 'status': 'fail'}
+            return make_response(jsonify(response)), 400
+        deleted = Categories.bulk_delete(current_user.id, ids, search)
+        response = {'message': 'successfully deleted {} categories'.format(len(deleted)),
+                    'status': 'success',
+                    'ids': deleted}
+        return make_response(jsonify(response)), 200
+
+
 category_view_search = SearchCategory.as_view('category_view_search')
 category_view_post = Category.as_view('category_view_post')
 category_manipulation = ManipulateCategory.as_view('category_manipulation')
+category_bulk_view = BulkCategories.as_view('category_bulk_view')
@@ -0,0 +1,198 @@
+"""Classes to export a user's categories and recipes in one streamed download
+and to import them back from an upload
+"""
+import csv
+import io
+from app.helpers.decorators import token_required
+from app.models import Categories
+from app.helpers.cookbook_import import import_cookbook
+from flask import request, jsonify, make_response, json, Response, stream_with_context, \
+    current_app
+from flask.views import MethodView
+
+FLAT_FIELDS = ('category_id', 'category_name', 'recipe_id', 'recipe_name',
+               'recipe_ingredients', 'recipe_methods',
+               'recipe_date_created', 'recipe_date_modified')
+
+MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+def flat_records(rows):
+    """Method to turn the export rows into one record per recipe, with an
+    empty recipe for categories that have none
+    """
+    for row in rows:
+        yield (row.id, row.category_name, row.recipe_id, row.recipe_name,
+               row.recipe_ingredients, row.recipe_methods,
+               row.recipe_date_created, row.recipe_date_modified)
+
+
+def nested_records(rows):
+    """Method to turn the export rows into one record per category holding
+    its recipes, relying on the rows being ordered by category
+    """
+    category = None
+    for row in rows:
+        if category is None or category['id'] != row.id:
+            if category is not None:
+                yield category
+            category = {'id': row.id,
+                        'category_name': row.category_name,
+                        'date_created': row.date_created,
+                        'date_modified': row.date_modified,
+                        'recipes': []}
+        if row.recipe_id is not None:
+            category['recipes'].append({'id': row.recipe_id,
+                                        'recipe_name': row.recipe_name,
+                                        'recipe_ingredients': row.recipe_ingredients,
+                                        'recipe_methods': row.recipe_methods,
+                                        'date_created': row.recipe_date_created,
+                                        'date_modified': row.recipe_date_modified})
+    if category is not None:
+        yield category
+
+
+def ndjson_lines(records, layout, batch_size):
+    """Method to write the records as lines of JSON, a batch of lines at a time
+    """
+    lines = []
+    for record in records:
+        if layout == 'flat':
+            record = dict(zip(FLAT_FIELDS, record))
+        lines.append(json.dumps(record) + '\n')
+        if len(lines) >= batch_size:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+def csv_lines(records, batch_size):
+    """Method to write the records as CSV under a header row, a batch of rows at a time
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FLAT_FIELDS)
+    rows = 0
+    for record in records:
+        writer.writerow(record)
+        rows += 1
+        if rows >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    yield buffer.getvalue()
+
+
+class ExportCookbook(MethodView):
+    """Class to stream all the categories and recipes of a user
+    """
+    methods = ['GET']
+    decorators = [token_required]
+
+    # export records written to the response at a time
+    batch_size = 500
+
+    def get(self, current_user):
+        """Method to download all the categories and recipes of the user
+        ---
+        tags:
+            - Export
+        produces:
+            - application/x-ndjson
+            - text/csv
+        security:
+          - TokenHeader: []
+        parameters:
+            - in: query
+              name: format
+              description: ndjson (default) or csv
+              type: string
+            - in: query
+              name: layout
+              description: nested (default for ndjson) to list recipes inside their category,
+                flat for one record per recipe, csv is always flat
+              type: string
+        responses:
+          200:
+            description: The streamed cookbook
+          400:
+            description: Format or layout is not valid
+        """
+        export_format = request.args.get('format', 'ndjson')
+        layout = request.args.get('layout', 'nested' if export_format == 'ndjson' else 'flat')
+        if export_format not in MEDIA_TYPES or layout not in ('nested', 'flat') or \
+                (export_format == 'csv' and layout == 'nested'):
+            response = {'message': 'Export format or layout is not valid',
+                        'status': 'fail'}
+            return make_response(jsonify(response)), 400
+
+        rows = Categories.export_rows(current_user.id)
+        records = nested_records(rows) if layout == 'nested' else flat_records(rows)
+        if export_format == 'csv':
+            lines = csv_lines(records, self.batch_size)
+        else:
+            lines = ndjson_lines(records, layout, self.batch_size)
+        response = Response(stream_with_context(lines), mimetype=MEDIA_TYPES[export_format])
+        response.headers['Content-Disposition'] = 'attachment; filename=cookbook.{}'.format(
+            export_format)
+        return response
+
+
+class ImportCookbook(MethodView):
+    """Class to import categories and recipes from an NDJSON or CSV upload
+    """
+    methods = ['POST']
+    decorators = [token_required]
+
+    def post(self, current_user):
+        """Method to import categories and recipes in the export formats
+        ---
+        tags:
+            - Export
+        produces:
+            - application/json
+        security:
+          - TokenHeader: []
+        consumes:
+            - application/x-ndjson
+            - text/csv
+            - multipart/form-data
+        parameters:
+            - in: query
+              name: format
+              description: ndjson (default), nested or flat, or csv
+              type: string
+            - in: formData
+              name: file
+              type: file
+              description: The upload, or send it as the request body
+        responses:
+          200:
+            description: Numbers of created categories and recipes, and the lines that failed
+          400:
+            description: Format is not valid
+        """
+        import_format = request.args.get('format', 'ndjson')
+        if import_format not in MEDIA_TYPES:
+            response = {'message': 'Import format is not valid',
+                        'status': 'fail'}
+            return make_response(jsonify(response)), 400
+        if request.mimetype == 'multipart/form-data':
+            upload = request.files.get('file')
+            if upload is None:
+                response = {'message': 'Kindly provide a file to import',
+                            'status': 'fail'}
+                return make_response(jsonify(response)), 400
+            lines = upload.stream
+        else:
+            lines = request.stream
+        response = import_cookbook(lines, import_format, current_user.id,
+                                   current_app.config['IMPORT_CHUNK_SIZE'])
+        response['status'] = 'success'
+        return make_response(jsonify(response)), 200
+
+
+export_view = ExportCookbook.as_view('export_view')
+import_view = ImportCookbook.as_view('import_view')
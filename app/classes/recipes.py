@@ -3,10 +3,25 @@
 
 import re
 from app.helpers.decorators import token_required
-from app.models import Recipes
-from flask import request, jsonify, make_response
+from app.models import Recipes, Categories, Ingredients
+from flask import request, jsonify, make_response, current_app
 from flask.views import MethodView
-from app.helpers.recipe_validators import recipe_validation
+from app.helpers.recipe_validators import recipe_validation, recipe_length_validation, \
+    recipe_details_validation
+from app.helpers.bulk_validators import bulk_selection
+from app.helpers.facets import selected_facets
+from app.helpers.ingredients import parse_ingredients
+from app.helpers.pagination import paginate_items, paginate_ids
+from app.helpers.search_index import search_index
+from app.helpers.pantry_index import pantry_index
+from app.helpers.envelope import wants_envelope, envelope_response, vary_on_accept
+from app.helpers.response_cache import cached_response
+from app.helpers.conditional import (
+    row_etag, not_modified, precondition_failed, collection_etag)
+from app.helpers.fields import RECIPE_FIELDS, selected_fields, project, serialize
+from marshmallow import ValidationError
+from sqlalchemy.orm.exc import StaleDataError
+from app import db
 
 
 class Recipe(MethodView):
@@ -25,6 +40,8 @@ class Recipe(MethodView):
         security:
           - TokenHeader: []
 
+        Send a JSON array of recipes instead of one recipe to create them all
+        in one transaction, the response then reports the result of each item.
         parameters:
             - in: body
               name: Recipe Register
@@ -57,6 +74,8 @@ class Recipe(MethodView):
           404:
             description: Category does not exist
         """
+        if isinstance(request.data, list):
+            return self.post_many(current_user, id, request.data)
         category_id = id
         if category_id:
             try:
@@ -97,6 +116,66 @@ class Recipe(MethodView):
                             'status': 'error'}
                 return make_response(jsonify(response)), 404
 
+    def post_many(self, current_user, category_id, items):
+        """Method to validate a list of recipes, check them for duplicates with one
+        query and create the valid ones with one insert
+        """
+        if not items or len(items) > current_app.config['BULK_RECIPES_MAX']:
+            response = {'message': 'Provide between 1 and {} recipes'.format(
+                current_app.config['BULK_RECIPES_MAX']), 'status': 'fail'}
+            return make_response(jsonify(response)), 400
+        if not Categories.query.filter_by(id=category_id, created_by=current_user.id).first():
+            response = {'message': 'Category does not exist',
+                        'status': 'error'}
+            return make_response(jsonify(response)), 404
+
+        results = []
+        valid = []
+        for index, item in enumerate(items):
+            try:
+                recipe = {'recipe_name': str(item.get('recipe_name', '')),
+                          'recipe_ingredients': str(item.get('recipe_ingredients', '')),
+                          'recipe_methods': str(item.get('recipe_methods', ''))}
+                recipe_validation(recipe['recipe_name'], recipe['recipe_methods'],
+                                  recipe['recipe_ingredients'])
+                recipe_length_validation(*recipe.values())
+            except (AttributeError, ValidationError) as e:
+                message = str(e) if isinstance(e, ValidationError) else 'Recipe is not valid'
+                results.append({'index': index, 'status': 'fail', 'message': message})
+                continue
+            results.append(None)
+            valid.append((index, recipe))
+
+        existing = Recipes.existing_recipe_names(
+            category_id, current_user.id, [recipe['recipe_name'] for _, recipe in valid])
+        to_create = []
+        for index, recipe in valid:
+            if recipe['recipe_name'] in existing:
+                results[index] = {'index': index, 'status': 'fail',
+                                  'message': 'Recipe name exists'}
+                continue
+            existing.add(recipe['recipe_name'])
+            to_create.append((index, recipe))
+
+        if to_create:
+            created = Recipes.bulk_create([recipe for _, recipe in to_create],
+                                          category_id, current_user.id)
+            for (index, _), recipe in zip(to_create, created):
+                results[index] = {'index': index, 'status': 'success',
+                                  'id': recipe.id,
+                                  'recipe_name': recipe.recipe_name,
+                                  'recipe_ingredients': recipe.recipe_ingredients,
+                                  'recipe_methods': recipe.recipe_methods,
+                                  'category_id': recipe.category_id,
+                                  'date_created': recipe.date_created,
+                                  'date_modified': recipe.date_modified}
+        response = {'created': len(to_create),
+                    'failed': len(items) - len(to_create),
+                    'results': results}
+        return make_response(jsonify(response)), 201 if to_create else 400
+
+    @vary_on_accept
+    @cached_response
     def get(self, current_user, id):
         """"Method to retrieve all the recipes that belong to a category
         ---
@@ -120,6 +199,14 @@ class Recipe(MethodView):
               name: limit
               description: The limit of recipes to be returned by the paginated results
 
+            - in: query
+              name: after
+              description: Cursor of the next page, leave empty for the first page of cursor results
+
+            - in: query
+              name: fields
+              description: Comma separated fields to return, e.g. id,recipe_name
+
         responses:
           200:
             schema:
@@ -133,25 +220,27 @@ class Recipe(MethodView):
 
         page = request.args.get('page', default=1, type=int)
         limit = request.args.get('limit', default=10, type=int)
+        cursor = request.args.get('after')
 
         category_id = id
-        recipes = Recipes.get_all_user_recipes(
-            category_id).paginate(page, limit, error_out=False)
-        results = []
-        for recipe in recipes.items:
-            recipe_obj = {'id': recipe.id,
-                          'recipe_name': recipe.recipe_name,
-                          'recipe_ingredients': recipe.recipe_ingredients,
-                          'recipe_methods': recipe.recipe_methods,
-                          'category_id': recipe.category_id,
-                          'date_created': recipe.date_created,
-                          'date_modified': recipe.date_modified,
-                          'previous_page': recipes.prev_num,
-                          'next_Page': recipes.next_num
-
-                         }
-
-            results.append(recipe_obj)
+        etag = collection_etag(current_user.id)
+        response = not_modified(etag)
+        if response:
+            return response
+        try:
+            fields = selected_fields(request.args.get('fields'), RECIPE_FIELDS, RECIPE_FIELDS)
+            query = project(Recipes.get_all_user_recipes(category_id), Recipes, fields)
+            total = None if cursor is not None else Recipes.count_category_recipes(category_id)
+            recipes, page_details = paginate_items(
+                query, Recipes.id, page, limit, cursor, total)
+        except ValidationError as e:
+            response = {'message': str(e)}
+            return make_response(jsonify(response)), 400
+        results = [serialize(recipe, fields) for recipe in recipes]
+        if wants_envelope():
+            return envelope_response(results, page_details, etag)
+        for recipe_obj in results:
+            recipe_obj.update(page_details)
         if len(results) <= 0:
             response = {'message': 'No  recipe found ',
                         'status': 'error'}
@@ -159,6 +248,7 @@ class Recipe(MethodView):
             return response
         response = jsonify(results)
         response.status_code = 200
+        response.set_etag(etag)
         return response
 
 
@@ -189,6 +279,10 @@ class ManipulateRecipes(MethodView):
               required: true
               description: Recipe id
               type: integer
+
+            - in: query
+              name: fields
+              description: Comma separated fields to return, e.g. id,recipe_name
         responses:
           200:
             schema:
@@ -199,22 +293,26 @@ class ManipulateRecipes(MethodView):
           200:
             description: OK
         """
-        recipe = Recipes.query.filter_by(category_id=id, id=recipe_id).first()
+        try:
+            fields = selected_fields(request.args.get('fields'), RECIPE_FIELDS, RECIPE_FIELDS)
+        except ValidationError as e:
+            response = {'message': str(e)}
+            return make_response(jsonify(response)), 400
+        recipe = project(Recipes.query.filter_by(category_id=id, id=recipe_id),
+                         Recipes, fields, required=('id', 'version')).first()
         if not recipe:
             response = {'message': 'No recipe found',
                         'status': 'error'}
             response = make_response(jsonify(response)), 404
             return response
         else:
-            response = {'id': recipe.id,
-                        'recipe_name': recipe.recipe_name,
-                        'recipe_ingredients': recipe.recipe_ingredients,
-                        'recipe_methods': recipe.recipe_methods,
-                        'category_id': recipe.category_id,
-                        'date_created': recipe.date_created,
-                        'date_modified': recipe.date_modified
-                       }
-            response = make_response(jsonify(response)), 201
+            etag = row_etag('recipe', recipe)
+            response = not_modified(etag)
+            if response:
+                return response
+            response = serialize(recipe, fields)
+            response = make_response(jsonify(response), 201)
+            response.set_etag(etag)
             return response
 
     def put(self, current_user, id, recipe_id):
@@ -244,6 +342,10 @@ class ManipulateRecipes(MethodView):
               required: true
               description: Recipe id
               type: integer
+
+            - in: header
+              name: If-Match
+              description: ETag of the recipe being edited, the edit is refused if it changed since
         responses:
           200:
             schema:
@@ -253,6 +355,8 @@ class ManipulateRecipes(MethodView):
             description: Recipe Name, Ingredients or methods not provided or valid
           404:
             description: No recipe found
+          412:
+            description: Recipe was changed by another request
           201:
             description: Successfully edited a recipe
         """
@@ -271,6 +375,9 @@ class ManipulateRecipes(MethodView):
                 response = make_response(jsonify(response)), 404
                 return response
             else:
+                response = precondition_failed(row_etag('recipe', recipe))
+                if response:
+                    return response
                 recipe.recipe_name = recipe_name
                 recipe.recipe_ingredients = recipe_ingredients
                 recipe.recipe_methods = recipe_methods
@@ -283,8 +390,14 @@ class ManipulateRecipes(MethodView):
                             'date_created': recipe.date_created,
                             'date_modified': recipe.date_modified
                            }
-                response = make_response(jsonify(response)), 201
+                response = make_response(jsonify(response), 201)
+                response.set_etag(row_etag('recipe', recipe))
                 return response
+        except StaleDataError:
+            db.session.rollback()
+            response = {'message': 'Resource was changed by another request, fetch it again before editing',
+                        'status': 'fail'}
+            return make_response(jsonify(response)), 412
         except Exception as e:
             response = {'message': str(e)}
             return make_response(jsonify(response)), 400
@@ -339,6 +452,8 @@ class SearchRecipe(MethodView):
     methods = ['GET']
     decorators = [token_required]
 
+    @vary_on_accept
+    @cached_response
     def get(self, current_user, id):
         """Method to search a recipe using a get request
         ---
@@ -357,7 +472,15 @@ class SearchRecipe(MethodView):
 
             - in: query
               name: q
-              description: The recipe to be searched for
+              description: Words to find in recipe names, ingredients and methods, best matches first
+
+            - in: query
+              name: facets
+              description: Comma separated category and date to count the matches in each category and date bucket, in v2 responses
+
+            - in: query
+              name: date_bucket
+              description: day, week, month (default) or year, the buckets of the date facet
 
             - in: query
               name: page
@@ -367,6 +490,14 @@ class SearchRecipe(MethodView):
               name: limit
               description: The limit of recipes to be returned by the paginated results
 
+            - in: query
+              name: after
+              description: Cursor of the next page, leave empty for the first page of cursor results
+
+            - in: query
+              name: fields
+              description: Comma separated fields to return, e.g. id,recipe_name
+
         responses:
           200:
             schema:
@@ -374,34 +505,77 @@ class SearchRecipe(MethodView):
               description: fetching a single recipe
           400:
             description: Page or page limit is not valid
+          404:
+            description: Category does not exist
           200:
             description: OK
         """
+        if not Categories.query.filter_by(id=id, created_by=current_user.id).first():
+            response = {'message': 'Category does not exist',
+                        'status': 'error'}
+            return make_response(jsonify(response)), 404
+        return self.search(current_user, id)
+
+    def search(self, current_user, category_id=None):
+        """Method to search the recipes of a user, in one category when given
+        """
         search = request.args.get('q', '')
         page = request.args.get('page', default=1, type=int)
         limit = request.args.get('limit', default=10, type=int)
+        cursor = request.args.get('after')
+        in_memory = current_app.config['SEARCH_BACKEND'] == 'memory'
 
+        try:
+            facets = selected_facets(request.args.get('facets'),
+                                     request.args.get('date_bucket', 'month'))
+        except ValidationError as e:
+            response = {'message': str(e),
+                        'status': 'error'}
+            return make_response(jsonify(response)), 400
+        if facets and not wants_envelope():
+            response = {'message': 'Facets are only returned in v2 responses',
+                        'status': 'error'}
+            return make_response(jsonify(response)), 400
+        if facets and in_memory and 'date' in facets:
+            response = {'message': 'Date facets are not available',
+                        'status': 'error'}
+            return make_response(jsonify(response)), 400
         if search:
-            category_id = id
-            recipes = Recipes.query.filter(Recipes.recipe_name.ilike(
-                '%' + search + '%')).filter(Recipes.category_id == category_id).paginate(
-                    per_page=limit, page=page, error_out=False)
-            results = []
-            for recipe in recipes.items:
-                recipe_obj = {'id': recipe.id,
-                              'recipe_name': recipe.recipe_name,
-                              'recipe_ingredients': recipe.recipe_ingredients,
-                              'recipe_methods': recipe.recipe_methods,
-                              'category_id': recipe.category_id,
-                              'date_created': recipe.date_created,
-                              'date_modified': recipe.date_modified,
-                              'previous_page': recipes.prev_num,
-                              'next_Page': recipes.next_num
-                             }
-
-                results.append(recipe_obj)
+            etag = collection_etag(current_user.id)
+            response = not_modified(etag)
+            if response:
+                return response
+            try:
+                fields = selected_fields(request.args.get('fields'), RECIPE_FIELDS, RECIPE_FIELDS)
+                if in_memory:
+                    found_ids = search_index.search_recipes(current_user.id, category_id, search)
+                    recipe_ids, page_details = paginate_ids(found_ids, page, limit, cursor)
+                    recipes = project(Recipes.query.filter(Recipes.id.in_(recipe_ids)),
+                                      Recipes, fields).all() if recipe_ids else []
+                    recipes.sort(key=lambda recipe: recipe_ids.index(recipe.id))
+                    if facets:
+                        facets = memory_category_facets(current_user.id, found_ids)
+                else:
+                    query, rank = Recipes.full_text_search(current_user.id, search, category_id)
+                    if facets:
+                        facets = Recipes.search_facets(query, facets,
+                                                       request.args.get('date_bucket', 'month'))
+                    if cursor is None and rank is not None:
+                        # cursor pages follow the id, numbered pages the best match first
+                        query = query.order_by(rank.desc(), Recipes.id)
+                    recipes, page_details = paginate_items(
+                        project(query, Recipes, fields), Recipes.id, page, limit, cursor)
+            except ValidationError as e:
+                response = {'message': str(e)}
+                return make_response(jsonify(response)), 400
+            results = [serialize(recipe, fields) for recipe in recipes]
+            if wants_envelope():
+                return envelope_response(results, page_details, etag, facets)
+            for recipe_obj in results:
+                recipe_obj.update(page_details)
             response = jsonify(results)
             response.status_code = 200
+            response.set_etag(etag)
             return response
         else:
             response = {'message': 'No search item provided',
@@ -409,7 +583,356 @@ class SearchRecipe(MethodView):
             return make_response(jsonify(response)), 200
 
 
+class SearchAllRecipes(SearchRecipe):
+    """Class to search the recipes of all categories of a user
+    """
+
+    @vary_on_accept
+    @cached_response
+    def get(self, current_user):
+        """Method to search the recipes of every category of the user
+        ---
+        tags:
+          - Recipes
+        produces:
+          - application/json
+        security:
+          - TokenHeader: []
+
+        parameters:
+            - in: query
+              name: q
+              description: Words to find in recipe names, ingredients and methods, best matches first
+
+            - in: query
+              name: facets
+              description: Comma separated category and date to count the matches in each category and date bucket, in v2 responses
+
+            - in: query
+              name: date_bucket
+              description: day, week, month (default) or year, the buckets of the date facet
+
+            - in: query
+              name: page
+              description: The number of pages of the results to be returned
+
+            - in: query
+              name: limit
+              description: The limit of recipes to be returned by the paginated results
+
+            - in: query
+              name: after
+              description: Cursor of the next page, leave empty for the first page of cursor results
+
+            - in: query
+              name: fields
+              description: Comma separated fields to return, e.g. id,recipe_name
+
+        responses:
+          200:
+            description: Recipes matching the search, with their facet counts when asked for
+          400:
+            description: Facets, page or page limit are not valid
+        """
+        return self.search(current_user)
+
+
+def memory_category_facets(user_id, recipe_ids):
+    """Method to count the recipes found by the in-process index in each
+    category, largest count first
+    """
+    counts = search_index.recipe_categories(user_id, recipe_ids)
+    names = dict(db.session.query(Categories.id, Categories.category_name).filter(
+        Categories.id.in_(counts))) if counts else {}
+    return {'total': len(recipe_ids), 'categories': [
+        {'category_id': category, 'category_name': names.get(category), 'count': count}
+        for category, count in sorted(counts.items(), key=lambda item: (-item[1], item[0]))]}
+
+
+class BulkRecipes(MethodView):
+    """Class to edit or delete many recipes of a category in one request
+    """
+    methods = ['PUT', 'DELETE']
+    decorators = [token_required]
+
+    def put(self, current_user, id):
+        """Method to set the ingredients or methods of the recipes picked by id or by name
+        ---
+        tags:
+            - Recipes
+        produces:
+            - application/json
+        security:
+          - TokenHeader: []
+        parameters:
+            - in: path
+              name: id
+              required: true
+              description: Category id of the category
+              type: integer
+            - in: body
+              name: selection
+              required: true
+              description: Either a list of recipe ids or a search term q, and the new values
+              schema:
+                id: bulk_recipe_update
+                properties:
+                  ids:
+                    type: array
+                    items:
+                      type: integer
+                  q:
+                    type: string
+                  recipe_ingredients:
+                    type: string
+                  recipe_methods:
+                    type: string
+        responses:
+          200:
+            description: Ids of the edited recipes
+          400:
+            description: Selection or new values are not valid
+        """
+        try:
+            ids, search = bulk_selection(request.data, current_app.config['BULK_IDS_MAX'])
+            values = {field: str(request.data[field]) for field in
+                      ('recipe_ingredients', 'recipe_methods') if field in request.data}
+            recipe_details_validation(*values.values())
+        except ValidationError as e:
+            response = {'message': str(e), 'status': 'fail'}
+            return make_response(jsonify(response)), 400
+        updated = Recipes.bulk_update(id, current_user.id, values, ids, search)
+        response = {'message': 'successfully edited {} recipes'.format(len(updated)),
+                    'status': 'success',
+                    'ids': updated}
+        return make_response(jsonify(response)), 200
+
+    def delete(self, current_user, id):
+        """Method to delete the recipes of a category picked by id or by name
+        ---
+        tags:
+            - Recipes
+        produces:
+            - application/json
+        security:
+          - TokenHeader: []
+        parameters:
+            - in: path
+              name: id
+              required: true
+              description: Category id of the category
+              type: integer
+            - in: body
+              name: selection
+              required: true
+              description: Either a list of recipe ids or a search term q
+              schema:
+                id: bulk_selection
+        responses:
+          200:
+            description: Ids of the deleted recipes
+          400:
+            description: Selection is not valid
+        """
+        try:
+            ids, search = bulk_selection(request.data, current_app.config['BULK_IDS_MAX'])
+        except ValidationError as e:
+            response = {'message': str(e), 'status': 'fail'}
+            return make_response(jsonify(response)), 400
+        deleted = Recipes.bulk_delete(id, current_user.id, ids, search)
+        response = {'message': 'successfully deleted {} recipes'.format(len(deleted)),
+                    'status': 'success',
+                    'ids': deleted}
+        return make_response(jsonify(response)), 200
+
+
+class RecipesByIngredients(MethodView):
+    """Class to find the recipes of a user by the ingredients they list
+    """
+    methods = ['GET']
+    decorators = [token_required]
+
+    @vary_on_accept
+    @cached_response
+    def get(self, current_user):
+        """Method to fetch the recipes of all categories listing the given ingredients
+        ---
+        tags:
+          - Recipes
+        produces:
+          - application/json
+        security:
+          - TokenHeader: []
+
+        parameters:
+            - in: query
+              name: ingredients
+              required: true
+              description: Comma separated ingredient names, e.g. milk,flour
+
+            - in: query
+              name: match
+              description: all to find recipes listing every ingredient (default), any for at least one
+
+            - in: query
+              name: page
+              description: The number of pages of the results to be returned
+
+            - in: query
+              name: limit
+              description: The limit of recipes to be returned by the paginated results
+
+            - in: query
+              name: after
+              description: Cursor of the next page, leave empty for the first page of cursor results
+
+            - in: query
+              name: fields
+              description: Comma separated fields to return, e.g. id,recipe_name
+
+        responses:
+          200:
+            description: Recipes listing the ingredients
+          400:
+            description: Ingredients, match or page are not valid
+        """
+        names = parse_ingredients(request.args.get('ingredients', ''))
+        match = request.args.get('match', 'all')
+        page = request.args.get('page', default=1, type=int)
+        limit = request.args.get('limit', default=10, type=int)
+        cursor = request.args.get('after')
+
+        if not names:
+            response = {'message': 'No ingredients provided',
+                        'status': 'error'}
+            return make_response(jsonify(response)), 400
+        if match not in ('all', 'any'):
+            response = {'message': 'Ingredient match not valid',
+                        'status': 'error'}
+            return make_response(jsonify(response)), 400
+        etag = collection_etag(current_user.id)
+        response = not_modified(etag)
+        if response:
+            return response
+        try:
+            fields = selected_fields(request.args.get('fields'), RECIPE_FIELDS, RECIPE_FIELDS)
+            recipes, page_details = paginate_items(project(
+                Ingredients.recipes_with(current_user.id, names, match == 'all'),
+                Recipes, fields), Recipes.id, page, limit, cursor)
+        except ValidationError as e:
+            response = {'message': str(e)}
+            return make_response(jsonify(response)), 400
+        results = [serialize(recipe, fields) for recipe in recipes]
+        if wants_envelope():
+            return envelope_response(results, page_details, etag)
+        for recipe_obj in results:
+            recipe_obj.update(page_details)
+        response = jsonify(results)
+        response.status_code = 200
+        response.set_etag(etag)
+        return response
+
+
+class PantryRecipes(MethodView):
+    """Class to find the recipes of a user that a pantry can cook
+    """
+    methods = ['GET']
+    decorators = [token_required]
+
+    @vary_on_accept
+    @cached_response
+    def get(self, current_user):
+        """Method to fetch the recipes sharing ingredients with a pantry, fewest missing first
+        ---
+        tags:
+          - Recipes
+        produces:
+          - application/json
+        security:
+          - TokenHeader: []
+
+        parameters:
+            - in: query
+              name: ingredients
+              required: true
+              description: Comma separated ingredient names in the pantry, e.g. milk,flour,eggs
+
+            - in: query
+              name: max_missing
+              description: Most ingredients a recipe may miss, 0 for the recipes the pantry can cook
+
+            - in: query
+              name: page
+              description: The number of pages of the results to be returned
+
+            - in: query
+              name: limit
+              description: The limit of recipes to be returned by the paginated results
+
+            - in: query
+              name: after
+              description: Cursor of the next page, leave empty for the first page of cursor results
+
+            - in: query
+              name: fields
+              description: Comma separated fields to return, e.g. id,recipe_name
+
+        responses:
+          200:
+            description: Recipes with the ingredients each of them misses
+          400:
+            description: Ingredients, max_missing or page are not valid
+        """
+        pantry = set(parse_ingredients(request.args.get('ingredients', '')))
+        max_missing = request.args.get('max_missing')
+        page = request.args.get('page', default=1, type=int)
+        limit = request.args.get('limit', default=10, type=int)
+        cursor = request.args.get('after')
+
+        if not pantry:
+            response = {'message': 'No ingredients provided',
+                        'status': 'error'}
+            return make_response(jsonify(response)), 400
+        if max_missing is not None:
+            if not max_missing.isdigit():
+                response = {'message': 'max_missing not valid',
+                            'status': 'error'}
+                return make_response(jsonify(response)), 400
+            max_missing = int(max_missing)
+        etag = collection_etag(current_user.id)
+        response = not_modified(etag)
+        if response:
+            return response
+        try:
+            fields = selected_fields(request.args.get('fields'), RECIPE_FIELDS, RECIPE_FIELDS)
+            recipe_ids, page_details, missing = pantry_index.cookable(
+                current_user.id, pantry, page, limit, cursor, max_missing)
+            recipes = project(Recipes.query.filter(Recipes.id.in_(recipe_ids)),
+                              Recipes, fields).all() if recipe_ids else []
+            recipes.sort(key=lambda recipe: recipe_ids.index(recipe.id))
+        except ValidationError as e:
+            response = {'message': str(e)}
+            return make_response(jsonify(response)), 400
+        results = []
+        for recipe in recipes:
+            recipe_obj = serialize(recipe, fields)
+            recipe_obj['missing_ingredients'] = missing[recipe.id]
+            results.append(recipe_obj)
+        if wants_envelope():
+            return envelope_response(results, page_details, etag)
+        for recipe_obj in results:
+            recipe_obj.update(page_details)
+        response = jsonify(results)
+        response.status_code = 200
+        response.set_etag(etag)
+        return response
+
+
 recipe_search_view = SearchRecipe.as_view('recipe_search_view')
+recipe_search_all_view = SearchAllRecipes.as_view('recipe_search_all_view')
 recipe_post_get_view = Recipe.as_view('recipe_post_get_view')
 recipe_manipulation_view = ManipulateRecipes.as_view(
     'recipe_manipulation_view')
+recipe_bulk_view = BulkRecipes.as_view('recipe_bulk_view')
+recipe_ingredients_view = RecipesByIngredients.as_view('recipe_ingredients_view')
+recipe_pantry_view = PantryRecipes.as_view('recipe_pantry_view')
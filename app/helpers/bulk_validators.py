@@ -0,0 +1,25 @@
+"""Methods to validate the selection of a bulk update or delete
+"""
+from marshmallow import ValidationError
+
+
+def bulk_selection(data, max_ids):
+    """Validation method for the rows picked by a bulk request, either a
+    list of ids or a search term, returns the ids and the search term
+    """
+    if not isinstance(data, dict):
+        raise ValidationError('Provide either a list of ids or a search term q')
+    ids = data.get('ids')
+    search = data.get('q')
+    if (ids is None) == (search is None):
+        raise ValidationError('Provide either a list of ids or a search term q')
+    if ids is not None:
+        if not isinstance(ids, list) or not ids or len(ids) > max_ids or \
+                not all(isinstance(item_id, int) and not isinstance(item_id, bool)
+                        for item_id in ids):
+            raise ValidationError('ids should be a list of 1 to {} ids'.format(max_ids))
+        return ids, None
+    search = str(search).strip()
+    if not search:
+        raise ValidationError('Search term q cannot be empty')
+    return None, search
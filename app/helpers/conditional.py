@@ -0,0 +1,65 @@
+"""Methods to answer conditional GETs with ETags
+"""
+import hashlib
+from flask import Response, request, jsonify, make_response
+from app.models import User
+from app.helpers.envelope import wants_envelope
+
+
+def make_etag(*parts):
+    """Method to build a strong ETag from the values that identify a representation
+    """
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def row_etag(kind, row):
+    """Method to build the ETag of a category or recipe from its id and
+    version only, so that every ?fields= representation of it can be sent
+    back in an If-Match
+    """
+    return make_etag(kind, row.id, row.version)
+
+
+def embedded_etag(etag, user_id):
+    """Method to extend the ETag of a row with the version of the user's
+    collection, for representations embedding other rows
+
+    The row's own ETag stays its prefix, which is all If-Match looks at.
+    """
+    return '{}-{}'.format(etag, collection_etag(user_id))
+
+
+def precondition_failed(etag):
+    """Method to return a 412 response when the request carries an If-Match
+    that matches neither the current ETag nor an embedding one built on it,
+    None otherwise
+    """
+    if request.if_match and not request.if_match.star_tag and not any(
+            tag == etag or tag.startswith(etag + '-') for tag in request.if_match.as_set()):
+        response = make_response(jsonify({
+            'message': 'Resource was changed by another request, fetch it again before editing',
+            'status': 'fail'}), 412)
+        response.set_etag(etag)
+        return response
+    return None
+
+
+def not_modified(etag):
+    """Method to return a 304 response when the client already holds the
+    representation with this ETag, None otherwise
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+
+def collection_etag(user_id):
+    """Method to build the ETag of a listing or search of a user
+
+    It changes with every write to the user's categories and recipes and
+    differs per URL, query string and response format.
+    """
+    return make_etag(user_id, User.get_collection_version(user_id),
+                     request.full_path, wants_envelope())
@@ -0,0 +1,222 @@
+"""Methods to import categories and recipes from an NDJSON or CSV stream
+"""
+import csv
+import io
+import json
+from sqlalchemy.exc import SQLAlchemyError
+from marshmallow import ValidationError
+from app import db
+from app.models import User, Categories, Recipes, Ingredients
+from app.helpers.category_validators import category_validation
+from app.helpers.recipe_validators import recipe_validation, recipe_length_validation, \
+    MAX_LENGTH
+from app.helpers.response_cache import response_cache
+
+RECIPE_COLUMNS = ('recipe_name', 'recipe_ingredients', 'recipe_methods')
+
+
+def read_records(lines, import_format):
+    """Method to read the lines of an upload, yielding the line number, the
+    category name and the recipes of each record, whether the recipes were
+    nested in the record, and the error of a line that cannot be read
+    """
+    if import_format == 'csv':
+        reader = csv.DictReader(line.decode('utf-8') for line in lines)
+        for row in reader:
+            recipe = {column: row.get(column) or '' for column in RECIPE_COLUMNS}
+            recipes = [recipe] if any(recipe.values()) else []
+            yield reader.line_num, row.get('category_name') or '', recipes, False, None
+        return
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line.decode('utf-8'))
+            if not isinstance(record, dict):
+                raise ValueError
+        except ValueError:
+            yield line_number, None, None, False, 'Line is not a JSON object'
+            continue
+        nested = 'recipes' in record
+        if nested:
+            recipes = record['recipes'] if isinstance(record['recipes'], list) else [None]
+        else:
+            recipe = {column: record.get(column) or '' for column in RECIPE_COLUMNS}
+            recipes = [recipe] if any(recipe.values()) else []
+        yield line_number, str(record.get('category_name') or ''), recipes, nested, None
+
+
+def validate_recipe(recipe):
+    """Method to validate one imported recipe, returning it with its values as text
+    """
+    if not isinstance(recipe, dict):
+        raise ValidationError('Recipe is not valid')
+    recipe = {column: str(recipe.get(column) or '') for column in RECIPE_COLUMNS}
+    recipe_validation(recipe['recipe_name'], recipe['recipe_methods'],
+                      recipe['recipe_ingredients'])
+    recipe_length_validation(*recipe.values())
+    return recipe
+
+
+class CookbookImport(object):
+    """Import of an upload for one user, saved one chunk of recipes at a time
+    with a report of the lines that could not be imported
+    """
+
+    # most errors listed in the report, the rest are only counted
+    max_errors = 1000
+
+    def __init__(self, user_id, chunk_size=1000):
+        """Constructor method to initialize the user, chunk and report
+        """
+        self.user_id = user_id
+        self.chunk_size = chunk_size
+        self.categories = 0
+        self.recipes = 0
+        self.error_count = 0
+        self.errors = []
+        self._chunk = []
+        self._category_names = set()
+
+    def error(self, line_number, message, recipe_index=None):
+        """Method to record a line that could not be imported
+        """
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            error = {'line': line_number, 'message': message}
+            if recipe_index is not None:
+                error['recipe'] = recipe_index
+            self.errors.append(error)
+
+    def run(self, lines, import_format):
+        """Method to import every record of the upload and return the report
+        """
+        for line_number, category_name, recipes, nested, error in read_records(
+                lines, import_format):
+            if error:
+                self.error(line_number, error)
+                continue
+            try:
+                category_validation(category_name)
+                if len(category_name) > MAX_LENGTH:
+                    raise ValidationError('Category name is not valid')
+            except ValidationError as e:
+                self.error(line_number, str(e))
+                continue
+            self._category_names.add(category_name)
+            for index, recipe in enumerate(recipes):
+                recipe_index = index if nested else None
+                try:
+                    recipe = validate_recipe(recipe)
+                except ValidationError as e:
+                    self.error(line_number, str(e), recipe_index)
+                    continue
+                self._chunk.append((line_number, recipe_index, category_name, recipe))
+            if len(self._chunk) >= self.chunk_size or \
+                    len(self._category_names) >= self.chunk_size:
+                self.flush()
+        self.flush()
+        return self.report()
+
+    def report(self):
+        """Method to summarize the import
+        """
+        return {'categories': self.categories,
+                'recipes': self.recipes,
+                'failed': self.error_count,
+                'errors': self.errors}
+
+    def flush(self):
+        """Method to save the pending chunk in its own transaction, a chunk
+        that fails to save is reported line by line
+        """
+        chunk, names = self._chunk, self._category_names
+        self._chunk, self._category_names = [], set()
+        if not names:
+            return
+        try:
+            categories, recipes = self.save_chunk(chunk, names)
+        except (SQLAlchemyError, db.engine.dialect.dbapi.Error):
+            db.session.rollback()
+            for line_number, recipe_index, _, _ in chunk:
+                self.error(line_number, 'Recipe could not be saved', recipe_index)
+            return
+        self.categories += categories
+        self.recipes += recipes
+        response_cache.invalidate_user(self.user_id)
+
+    def save_chunk(self, chunk, names):
+        """Method to create the missing categories of a chunk, skip recipes
+        that already exist and copy in the rest, returning how many
+        categories and recipes were created
+        """
+        category_ids = dict(db.session.query(Categories.category_name, Categories.id).filter(
+            Categories.created_by == self.user_id, Categories.category_name.in_(names)))
+        missing = [{'category_name': name, 'created_by': self.user_id}
+                   for name in names if name not in category_ids]
+        if missing:
+            category_ids.update(db.session.execute(
+                Categories.__table__.insert().values(missing).returning(
+                    Categories.category_name, Categories.id)).fetchall())
+
+        existing = set()
+        if chunk:
+            existing.update(db.session.query(Recipes.category_id, Recipes.recipe_name).filter(
+                Recipes.created_by == self.user_id,
+                Recipes.category_id.in_(set(category_ids.values())),
+                Recipes.recipe_name.in_({recipe['recipe_name'] for _, _, _, recipe in chunk})))
+        rows = []
+        for line_number, recipe_index, category_name, recipe in chunk:
+            key = (category_ids[category_name], recipe['recipe_name'])
+            if key in existing:
+                self.error(line_number, 'Recipe name exists', recipe_index)
+                continue
+            existing.add(key)
+            rows.append(dict(recipe, category_id=key[0], created_by=self.user_id))
+
+        if rows:
+            copy_recipes(rows)
+            # COPY returns no ids, read the new rows back to link their ingredients
+            Ingredients.link_recipes(db.session.query(
+                Recipes.id, Recipes.recipe_ingredients).filter(
+                    Recipes.created_by == self.user_id,
+                    db.tuple_(Recipes.category_id, Recipes.recipe_name).in_(
+                        [(row['category_id'], row['recipe_name']) for row in rows])))
+            per_category = {}
+            for row in rows:
+                per_category[row['category_id']] = per_category.get(row['category_id'], 0) + 1
+            for category_id, recipes in per_category.items():
+                Categories.update_recipe_count(category_id, recipes)
+        User.record_write(self.user_id, categories=len(missing), recipes=len(rows))
+        db.session.commit()
+        return len(missing), len(rows)
+
+
+def copy_recipes(rows):
+    """Method to insert recipe rows in the current transaction, with COPY
+    on Postgres and a multi-row INSERT elsewhere
+    """
+    connection = db.session.connection()
+    if connection.dialect.driver != 'psycopg2':
+        db.session.execute(Recipes.__table__.insert().values(rows))
+        return
+    now = db.session.execute(db.select([db.func.current_timestamp()])).scalar()
+    columns = RECIPE_COLUMNS + ('category_id', 'created_by', 'date_created', 'date_modified')
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row[column] for column in columns[:5]] + [now, now])
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert('COPY recipes ({}) FROM STDIN WITH (FORMAT csv)'.format(
+            ', '.join(columns)), buffer)
+    finally:
+        cursor.close()
+
+
+def import_cookbook(lines, import_format, user_id, chunk_size=1000):
+    """Method to import the categories and recipes in the lines of an
+    NDJSON or CSV upload for a user and return the report
+    """
+    return CookbookImport(user_id, chunk_size).run(lines, import_format)
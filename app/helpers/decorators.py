@@ -2,7 +2,10 @@
 """
 from functools import wraps
 from flask import jsonify, make_response, request
-from app.models import User, Sessions
+from app import db
+from app.models import User
+from app.helpers.principal import UserPrincipal
+from app.helpers.token_cache import verified_tokens
 
 
 def token_required(f):
@@ -11,7 +14,7 @@ def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         """Decorator method to handle access token
-        issuance and blacklisting on logout
+        verification and revocation on logout
         """
         access_token = None
         authorization_header = request.headers.get('Authorization')
@@ -21,12 +24,23 @@ def token_required(f):
             response = {"message": "User is not authenticated"}
             return make_response(jsonify(response)), 401
         try:
-            blacklisted_token = Sessions.check_logout_status(access_token)
-            if blacklisted_token:
-                return make_response(
-                    jsonify({"message":"User is already logged out, Please login"}), 401)
-            else:
-                current_user = User.query.filter_by(id=User.decode_token(access_token)).first()
+            user_id = verified_tokens.get(access_token)
+            if user_id is None:
+                token_claims = User.decode_token_claims(access_token)
+                if not isinstance(token_claims, dict):
+                    return make_response(jsonify({"message": token_claims}), 401)
+                token_version = db.session.query(User.token_version).filter_by(
+                    id=token_claims['usr']).scalar()
+                if token_version is None:
+                    return make_response(jsonify({"message": "User is not authenticated"}), 401)
+                # tokens from before the user's last logout or password reset
+                # carry an older version and are no longer accepted
+                if token_version != token_claims.get('ver'):
+                    return make_response(
+                        jsonify({"message":"User is already logged out, Please login"}), 401)
+                user_id = token_claims['usr']
+                verified_tokens.set(access_token, user_id, token_claims['exp'])
+            current_user = UserPrincipal(user_id)
         except Exception:
             return {"message":"Token is expired"}
         return f(current_user, *args, **kwargs)
@@ -0,0 +1,48 @@
+"""Methods to embed the recipes of categories in category responses
+"""
+from marshmallow import ValidationError
+from app.models import Recipes
+from app.helpers.fields import RECIPE_FIELDS, serialize
+from app.helpers.pagination import encode_cursor
+
+EMBEDS = ('recipes',)
+# recipes embedded per category when ?embed_limit= is not given
+EMBED_LIMIT = 5
+
+
+def selected_embeds(requested):
+    """Method to validate the comma separated ?embed= of a request
+    """
+    if not requested:
+        return ()
+    embeds = tuple(embed.strip() for embed in requested.split(',') if embed.strip())
+    unknown = [embed for embed in embeds if embed not in EMBEDS]
+    if unknown or not embeds:
+        raise ValidationError('Embed not valid: {}'.format(', '.join(unknown)))
+    return embeds
+
+
+def embed_limit(requested, maximum):
+    """Method to validate the ?embed_limit= of a request
+    """
+    if requested is None:
+        return min(EMBED_LIMIT, maximum)
+    if not requested.isdigit() or not 1 <= int(requested) <= maximum:
+        raise ValidationError('Embed limit not valid')
+    return int(requested)
+
+
+def embed_recipes(categories, results, limit):
+    """Method to add the first recipes of each category to its response with
+    one query, along with the cursor of its next recipes, if any
+    """
+    recipes = {}
+    for recipe in Recipes.first_recipes_of_categories(
+            [category.id for category in categories], limit + 1):
+        recipes.setdefault(recipe.category_id, []).append(recipe)
+    for category, result in zip(categories, results):
+        category_recipes = recipes.get(category.id, [])
+        result['recipes'] = [serialize(recipe, RECIPE_FIELDS)
+                             for recipe in category_recipes[:limit]]
+        result['recipes_next_cursor'] = encode_cursor(category_recipes[limit - 1].id) \
+            if len(category_recipes) > limit else None
@@ -0,0 +1,44 @@
+"""Methods to serve list responses in the v2 page envelope
+"""
+from functools import wraps
+from flask import jsonify, make_response, request
+from app import base_url_v2
+
+V2_MEDIA_TYPE = 'application/vnd.yummy.v2+json'
+
+
+def wants_envelope():
+    """Method to check if the client asked for v2 list responses, either
+    through the /yummy_api/v2 prefix or the v2 media type in its Accept header
+    """
+    return request.path.startswith(base_url_v2 + '/') or \
+        V2_MEDIA_TYPE in request.headers.get('Accept', '')
+
+
+def vary_on_accept(f):
+    """Decorator for the list and search views whose body depends on the
+    Accept header, to mark each of their responses with Vary: Accept so that
+    shared caches keep the v1 and v2 shapes apart
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        response = make_response(f(*args, **kwargs))
+        response.vary.add('Accept')
+        return response
+    return decorated
+
+
+def envelope_response(items, page_details, etag=None, facets=None):
+    """Method to return the items of a page in one array with the page
+    details given once alongside them, under lower case keys, and the
+    facet counts of a search when asked for
+    """
+    page = {key.lower(): value for key, value in page_details.items()}
+    body = {'items': items, 'page': page}
+    if facets is not None:
+        body['facets'] = facets
+    response = jsonify(body)
+    response.status_code = 200
+    if etag:
+        response.set_etag(etag)
+    return response
@@ -0,0 +1,45 @@
+"""Methods to validate the facets of a search and to count them with one
+grouped aggregate
+"""
+from marshmallow import ValidationError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ColumnElement
+
+FACETS = ('category', 'date')
+DATE_BUCKETS = ('day', 'week', 'month', 'year')
+
+
+def selected_facets(requested, date_bucket):
+    """Validation method for the comma separated ?facets= of a search and
+    its date bucket, returns the facets or None when none are asked for
+    """
+    if requested is None:
+        return None
+    facets = tuple(facet.strip() for facet in requested.split(',') if facet.strip())
+    unknown = [facet for facet in facets if facet not in FACETS]
+    if unknown or not facets:
+        raise ValidationError('Facets not valid: {}'.format(', '.join(unknown)))
+    if date_bucket not in DATE_BUCKETS:
+        raise ValidationError('Date bucket not valid, use one of {}'.format(
+            ', '.join(DATE_BUCKETS)))
+    return facets
+
+
+class GroupingSets(ColumnElement):
+    """GROUP BY GROUPING SETS clause, one set per tuple of columns, which
+    SQLAlchemy 1.1 has no construct for
+    """
+
+    def __init__(self, *sets):
+        """Constructor method to keep the column tuples of the sets
+        """
+        self.sets = sets
+
+
+@compiles(GroupingSets)
+def compile_grouping_sets(element, compiler, **kw):
+    """Method to render the grouping sets of a GROUP BY
+    """
+    return 'GROUPING SETS ({})'.format(', '.join(
+        '({})'.format(', '.join(compiler.process(column, **kw) for column in columns))
+        for columns in element.sets))
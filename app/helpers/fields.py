@@ -0,0 +1,40 @@
+"""Methods to return only the fields a client asks for
+"""
+from marshmallow import ValidationError
+
+CATEGORY_FIELDS = ('id', 'category_name', 'created_by', 'date_created', 'date_modified')
+# the category listing leaves out the owner, unlike the other category responses
+CATEGORY_LIST_FIELDS = ('id', 'category_name', 'date_created', 'date_modified')
+RECIPE_FIELDS = ('id', 'recipe_name', 'recipe_ingredients', 'recipe_methods',
+                 'category_id', 'date_created', 'date_modified')
+
+
+def selected_fields(requested, default_fields, allowed_fields):
+    """Method to validate the comma separated ?fields= of a request
+
+    Returns the default fields of the endpoint when none are requested.
+    """
+    if not requested:
+        return default_fields
+    fields = tuple(field.strip() for field in requested.split(',') if field.strip())
+    unknown = [field for field in fields if field not in allowed_fields]
+    if unknown or not fields:
+        raise ValidationError('Fields not valid: {}'.format(', '.join(unknown)))
+    return fields
+
+
+def project(query, model, fields, required=('id',)):
+    """Method to make a query load only the columns of the selected fields
+
+    The required columns are loaded as well, by default the id since
+    pagination cursors are built from it.
+    """
+    columns = [getattr(model, field) for field in fields]
+    columns.extend(getattr(model, field) for field in required if field not in fields)
+    return query.with_entities(*columns)
+
+
+def serialize(row, fields):
+    """Method to turn a projected row into a response dictionary
+    """
+    return {field: getattr(row, field) for field in fields}
@@ -0,0 +1,131 @@
+"""Password hashing on a bounded pool of worker threads
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from flask_bcrypt import Bcrypt
+
+bcrypt = Bcrypt()
+
+
+class HashingPoolSaturated(Exception):
+    """Raised when every worker is busy and the hashing queue is full
+    """
+
+    def __init__(self, retry_after):
+        """Constructor method to keep the suggested retry delay in seconds
+        """
+        super(HashingPoolSaturated, self).__init__('Server is busy, Please try again later')
+        self.retry_after = retry_after
+
+
+class HashingPool(object):
+    """Runs bcrypt work off the request thread with admission control
+
+    At most ``workers`` hashes run at once and at most ``queue_size`` more
+    wait for a worker. Anything beyond that is refused straight away with
+    HashingPoolSaturated instead of piling up behind the busy workers.
+    """
+
+    def __init__(self, workers=2, queue_size=16, retry_after=1):
+        """Constructor method to initialize the pool limits and counters
+        """
+        self._lock = threading.Lock()
+        self._executor = None
+        self.in_flight = 0
+        self.configure(workers, queue_size, retry_after)
+
+    def configure(self, workers, queue_size, retry_after=1):
+        """Method to apply the limits from the app configuration, jobs
+        already admitted finish on the executor they were given
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self.workers = workers
+            self.queue_size = queue_size
+            self.retry_after = retry_after
+            self._executor = ThreadPoolExecutor(max_workers=workers)
+            self._slots = threading.BoundedSemaphore(workers + queue_size)
+            self.completed = 0
+            self.rejected = 0
+            self.started = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+
+    def run(self, func, *args):
+        """Method to run func(*args) on the pool and wait for its result
+        """
+        with self._lock:
+            # keep the slots and executor of this job should the pool be reconfigured
+            slots, executor = self._slots, self._executor
+            if not slots.acquire(blocking=False):
+                self.rejected += 1
+                raise HashingPoolSaturated(self.retry_after)
+            self.in_flight += 1
+            submitted = time.time()
+            try:
+                future = executor.submit(self._timed, submitted, func, *args)
+            except BaseException:
+                self.in_flight -= 1
+                slots.release()
+                raise
+        try:
+            return future.result()
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+            slots.release()
+
+    def _timed(self, submitted, func, *args):
+        """Records how long the job queued before running it
+        """
+        wait = time.time() - submitted
+        with self._lock:
+            self.started += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        return func(*args)
+
+    def stats(self):
+        """Method to report the queue depth and the time spent waiting for a worker
+        """
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'in_flight': self.in_flight,
+                'queue_depth': max(self.in_flight - self.workers, 0),
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'avg_wait_ms': round(self.total_wait * 1000 / self.started, 3) if self.started else 0.0,
+                'max_wait_ms': round(self.max_wait * 1000, 3)
+            }
+
+
+hashing_pool = HashingPool()
+
+
+def generate_password_hash(password):
+    """Hashes a password or secret word on the hashing pool with the configured cost
+    """
+    rounds = current_app.config['BCRYPT_LOG_ROUNDS']
+    return hashing_pool.run(bcrypt.generate_password_hash, password, rounds).decode()
+
+
+def check_password_hash(pw_hash, password):
+    """Compares a password or secret word with its stored hash on the hashing pool
+    """
+    return hashing_pool.run(bcrypt.check_password_hash, pw_hash, password)
+
+
+def hash_needs_update(pw_hash):
+    """Checks if a stored hash was made with a lower cost than the configured
+    one, or a higher one when BCRYPT_ALLOW_DOWNGRADE is set
+    """
+    # bcrypt hashes look like $2b$<cost>$<salt and digest>
+    cost = int(pw_hash.split('$')[2])
+    rounds = current_app.config['BCRYPT_LOG_ROUNDS']
+    return cost < rounds or (cost > rounds and current_app.config['BCRYPT_ALLOW_DOWNGRADE'])
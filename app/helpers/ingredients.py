@@ -0,0 +1,25 @@
+"""Methods to split the free text ingredients of a recipe into ingredient names
+"""
+import re
+
+# ingredients of a recipe are listed one per line or separated by commas
+# or semicolons, migration 2c6f8e1b9d34 splits existing rows the same way
+SEPARATORS = re.compile(r'[,;\n]')
+
+
+def normalize_ingredient(name):
+    """Method to turn an ingredient into its lower case name with single spaces
+    """
+    return ' '.join(name.split()).lower()
+
+
+def parse_ingredients(text):
+    """Method to return the distinct ingredient names of a recipe's
+    ingredients, in the order they are listed
+    """
+    names = []
+    for part in SEPARATORS.split(text or ''):
+        name = normalize_ingredient(part)
+        if name and name not in names:
+            names.append(name)
+    return names
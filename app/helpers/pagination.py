@@ -0,0 +1,84 @@
+"""Methods to page through query results with opaque cursors
+"""
+import base64
+import binascii
+from flask_sqlalchemy import Pagination
+from marshmallow import ValidationError
+
+
+def encode_cursor(last_id):
+    """Method to turn the id of the last item on a page into an opaque cursor
+    """
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Method to read the id back from a cursor, None for the first page
+    """
+    if not cursor:
+        return None
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode((cursor + padding).encode()).decode())
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise ValidationError('Cursor is not valid')
+
+
+def keyset_page(query, id_column, cursor, limit):
+    """Method to fetch the page of a query that follows the cursor
+
+    Rows are ordered by id and the page starts right after the id in the
+    cursor, so no OFFSET or COUNT(*) is needed and rows inserted meanwhile
+    never shift later pages. Returns the items and the cursor of the next
+    page, which is None on the last page.
+    """
+    if limit < 1:
+        raise ValidationError('Limit number not valid')
+    after_id = decode_cursor(cursor)
+    if after_id is not None:
+        query = query.filter(id_column > after_id)
+    rows = query.order_by(id_column).limit(limit + 1).all()
+    items = rows[:limit]
+    next_cursor = encode_cursor(items[-1].id) if len(rows) > limit else None
+    return items, next_cursor
+
+
+def paginate_items(query, id_column, page, limit, cursor=None, total=None):
+    """Method to page a query by cursor when one is given, else by page number
+
+    When the total number of rows is already known, e.g. from a counter,
+    page numbers are worked out from it instead of running a COUNT(*).
+    Returns the items of the page and the page details that go with them.
+    """
+    if cursor is not None:
+        items, next_cursor = keyset_page(query, id_column, cursor, limit)
+        return items, {'next_cursor': next_cursor}
+    if total is None:
+        pages = query.paginate(page, limit, error_out=False)
+    else:
+        page = max(page, 1)
+        limit = limit if limit >= 0 else 20
+        items = query.limit(limit).offset((page - 1) * limit).all()
+        pages = Pagination(query, page, limit, total, items)
+    return pages.items, {'previous_page': pages.prev_num, 'next_Page': pages.next_num}
+
+
+def paginate_ids(ids, page, limit, cursor=None):
+    """Method to page a list of ids found outside the database the same way
+    paginate_items pages a query
+
+    Numbered pages keep the order of the ids, cursor pages follow the ids
+    in ascending order. Returns the ids of the page and the page details.
+    """
+    if cursor is not None:
+        if limit < 1:
+            raise ValidationError('Limit number not valid')
+        after_id = decode_cursor(cursor)
+        ids = sorted(item_id for item_id in ids if after_id is None or item_id > after_id)
+        page_ids = ids[:limit]
+        next_cursor = encode_cursor(page_ids[-1]) if len(ids) > limit else None
+        return page_ids, {'next_cursor': next_cursor}
+    page = max(page, 1)
+    limit = limit if limit >= 0 else 20
+    pages = Pagination(None, page, limit, len(ids), ids[(page - 1) * limit:page * limit])
+    return pages.items, {'previous_page': pages.prev_num, 'next_Page': pages.next_num}
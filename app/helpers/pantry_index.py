@@ -0,0 +1,283 @@
+"""In-process bitmap index of the ingredients of each user's recipes, to find
+the recipes a pantry can cook
+"""
+import threading
+from array import array
+from collections import OrderedDict
+import numpy as np
+from app.helpers.pagination import paginate_ids
+
+
+class PantryBitmaps(object):
+    """Ingredient sets of the recipes of one user, as of a version of the
+    user's collection
+
+    Every recipe takes a slot, and each ingredient keeps the slots of the
+    recipes listing it. Common ingredients keep them as a packed bit array
+    over all slots, rare ones as a list of slots, whichever is smaller, so
+    a query adds up the pantry's ingredients in a few vectorized operations.
+    """
+
+    # an ingredient turns into a bit array once its slot list would be
+    # larger, i.e. once more than one recipe in 32 lists it
+    dense_ratio = 32
+
+    def __init__(self, version, capacity=64):
+        """Constructor method to initialize empty bitmaps at a version
+        """
+        self.version = version
+        self.capacity = capacity
+        self.recipe_ids = np.zeros(capacity, dtype=np.int64)
+        self.groups = np.zeros(capacity, dtype=np.int64)
+        self.counts = np.zeros(capacity, dtype=np.uint16)
+        self.slots = {}
+        self.free = list(range(capacity - 1, -1, -1))
+        self.names = {}
+        self.vocabulary = []
+        self.sparse = {}
+        self.dense = {}
+        self.recipe_terms = {}
+
+    def __len__(self):
+        """Method to report the number of indexed recipes
+        """
+        return len(self.slots)
+
+    def _grow(self):
+        """Doubles the slots of the recipes and of every bit array
+        """
+        extra = self.capacity
+        self.recipe_ids = np.concatenate((self.recipe_ids, np.zeros(extra, dtype=np.int64)))
+        self.groups = np.concatenate((self.groups, np.zeros(extra, dtype=np.int64)))
+        self.counts = np.concatenate((self.counts, np.zeros(extra, dtype=np.uint16)))
+        for term, bits in self.dense.items():
+            self.dense[term] = np.concatenate((bits, np.zeros(extra // 8, dtype=np.uint8)))
+        self.free.extend(range(self.capacity * 2 - 1, self.capacity - 1, -1))
+        self.capacity *= 2
+
+    def _term(self, name):
+        """Returns the number of an ingredient name, numbering new ones
+        """
+        term = self.names.get(name)
+        if term is None:
+            term = self.names[name] = len(self.vocabulary)
+            self.vocabulary.append(name)
+            self.sparse[term] = array('i')
+        return term
+
+    def add(self, recipe_id, names, group=None):
+        """Method to index the ingredient names of a recipe, replacing any
+        earlier version of it
+        """
+        if recipe_id in self.slots:
+            self.remove(recipe_id)
+        names = set(names)
+        if not names:
+            return
+        if not self.free:
+            self._grow()
+        slot = self.free.pop()
+        self.slots[recipe_id] = slot
+        self.recipe_ids[slot] = recipe_id
+        self.groups[slot] = group or 0
+        self.counts[slot] = len(names)
+        terms = tuple(self._term(name) for name in names)
+        self.recipe_terms[recipe_id] = terms
+        for term in terms:
+            bits = self.dense.get(term)
+            if bits is not None:
+                bits[slot >> 3] |= 0x80 >> (slot & 7)
+                continue
+            slots = self.sparse[term]
+            slots.append(slot)
+            if len(slots) * self.dense_ratio > self.capacity:
+                positions = np.frombuffer(slots, dtype=np.int32)
+                bits = np.zeros(self.capacity // 8, dtype=np.uint8)
+                np.bitwise_or.at(bits, positions >> 3,
+                                 (0x80 >> (positions & 7)).astype(np.uint8))
+                self.dense[term] = bits
+                del self.sparse[term]
+
+    def remove(self, recipe_id):
+        """Method to drop a recipe from the bitmaps
+        """
+        slot = self.slots.pop(recipe_id, None)
+        if slot is None:
+            return
+        for term in self.recipe_terms.pop(recipe_id):
+            bits = self.dense.get(term)
+            if bits is not None:
+                bits[slot >> 3] &= ~np.uint8(0x80 >> (slot & 7))
+            else:
+                self.sparse[term].remove(slot)
+        self.recipe_ids[slot] = 0
+        self.groups[slot] = 0
+        self.counts[slot] = 0
+        self.free.append(slot)
+
+    def remove_group(self, group):
+        """Method to drop every recipe of a group, e.g. of a category
+        """
+        for slot in np.nonzero(self.groups == group)[0]:
+            if self.counts[slot]:
+                self.remove(int(self.recipe_ids[slot]))
+
+    def matches(self, pantry, max_missing=None):
+        """Method to return the ids of the recipes listing at least one of
+        the pantry's ingredient names, fewest ingredients missing from it
+        first, then by id
+        """
+        terms = {self.names[name] for name in pantry if name in self.names}
+        if not terms or not self.slots:
+            return []
+        found = np.zeros(self.capacity, dtype=np.uint16)
+        sparse = [np.frombuffer(self.sparse[term], dtype=np.int32)
+                  for term in terms if term in self.sparse]
+        if sparse:
+            found += np.bincount(np.concatenate(sparse),
+                                 minlength=self.capacity).astype(np.uint16)
+        for term in terms:
+            if term in self.dense:
+                found += np.unpackbits(self.dense[term])
+        slots = np.nonzero(found)[0]
+        missing = self.counts[slots] - found[slots]
+        if max_missing is not None:
+            keep = missing <= max_missing
+            slots, missing = slots[keep], missing[keep]
+        recipe_ids = self.recipe_ids[slots]
+        return recipe_ids[np.lexsort((recipe_ids, missing))].tolist()
+
+    def missing_names(self, recipe_id, pantry):
+        """Method to list the ingredient names of a recipe missing from the pantry
+        """
+        return sorted(self.vocabulary[term] for term in self.recipe_terms.get(recipe_id, ())
+                      if self.vocabulary[term] not in pantry)
+
+
+class PantryIndex(object):
+    """Bounded LRU of the pantry bitmaps of users, kept up to date by the
+    model hooks and rebuilt from the database when a user's collection
+    version moved on without them
+    """
+
+    def __init__(self, max_users=64):
+        """Constructor method to initialize an empty index and its counters
+        """
+        self.max_users = max_users
+        self.builds = 0
+        self.updates = 0
+        self.searches = 0
+        self._users = OrderedDict()
+        self._lock = threading.RLock()
+
+    def configure(self, max_users):
+        """Method to apply the limit from the app configuration
+        """
+        with self._lock:
+            self.max_users = max_users
+            self._users.clear()
+            self.builds = 0
+            self.updates = 0
+            self.searches = 0
+
+    def build(self, user_id):
+        """Method to index the ingredients of all recipes of a user from the database
+        """
+        from app.models import User, Ingredients
+        bitmaps = PantryBitmaps(User.get_collection_version(user_id))
+        recipe_id, category_id, names = None, None, []
+        for row in Ingredients.pantry_documents(user_id):
+            if row.recipe_id != recipe_id:
+                if names:
+                    bitmaps.add(recipe_id, names, category_id)
+                recipe_id, category_id, names = row.recipe_id, row.category_id, []
+            names.append(row.name)
+        if names:
+            bitmaps.add(recipe_id, names, category_id)
+        return bitmaps
+
+    def user_bitmaps(self, user_id):
+        """Method to fetch the bitmaps of a user, building them when they are
+        missing or older than the user's collection
+        """
+        from app.models import User
+        version = User.get_collection_version(user_id)
+        with self._lock:
+            bitmaps = self._users.get(user_id)
+            if bitmaps is not None and bitmaps.version == version:
+                self._users.move_to_end(user_id)
+                self.searches += 1
+                return bitmaps
+        bitmaps = self.build(user_id)
+        with self._lock:
+            self.builds += 1
+            self.searches += 1
+            self._users[user_id] = bitmaps
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return bitmaps
+
+    def cookable(self, user_id, pantry, page, limit, cursor=None, max_missing=None):
+        """Method to return the page of a user's recipes sharing ingredients
+        with the pantry, fewest missing first, its page details and the
+        ingredients each recipe of the page misses, all read under the lock
+        """
+        bitmaps = self.user_bitmaps(user_id)
+        with self._lock:
+            recipe_ids, page_details = paginate_ids(
+                bitmaps.matches(pantry, max_missing), page, limit, cursor)
+            return recipe_ids, page_details, {
+                recipe_id: bitmaps.missing_names(recipe_id, pantry) for recipe_id in recipe_ids}
+
+    def apply(self, user_id, version, change):
+        """Method to apply a write that moved a user's collection to version
+        to the user's bitmaps, which are dropped when they missed an earlier write
+        """
+        with self._lock:
+            bitmaps = self._users.get(user_id)
+            if bitmaps is None:
+                return
+            if bitmaps.version != version - 1:
+                del self._users[user_id]
+                return
+            change(bitmaps)
+            bitmaps.version = version
+            self.updates += 1
+
+    def recipe_saved(self, user_id, version, recipe_id, names, category_id):
+        """Method to index the ingredients of a created or edited recipe
+        """
+        self.apply(user_id, version, lambda bitmaps: bitmaps.add(recipe_id, names, category_id))
+
+    def recipe_deleted(self, user_id, version, recipe_id):
+        """Method to drop a deleted recipe from the bitmaps
+        """
+        self.apply(user_id, version, lambda bitmaps: bitmaps.remove(recipe_id))
+
+    def category_saved(self, user_id, version):
+        """Method to follow a category write, which changes no ingredients
+        """
+        self.apply(user_id, version, lambda bitmaps: None)
+
+    def category_deleted(self, user_id, version, category_id):
+        """Method to drop the recipes of a deleted category from the bitmaps
+        """
+        self.apply(user_id, version, lambda bitmaps: bitmaps.remove_group(category_id))
+
+    def stats(self):
+        """Method to report the number of indexed users and recipes and how
+        often the bitmaps were searched, rebuilt and updated in place
+        """
+        with self._lock:
+            return {
+                'users': len(self._users),
+                'recipes': sum(len(bitmaps) for bitmaps in self._users.values()),
+                'max_users': self.max_users,
+                'searches': self.searches,
+                'builds': self.builds,
+                'updates': self.updates
+            }
+
+
+pantry_index = PantryIndex()
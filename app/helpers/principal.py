@@ -0,0 +1,36 @@
+"""Lightweight stand-in for the authenticated user
+"""
+from app.models import User
+
+
+class UserPrincipal(object):
+    """The user a verified access token was issued to
+
+    Holds only the user id taken from the token claims, which is all most
+    views need. The full User row is loaded the first time any other
+    attribute is read.
+    """
+    __slots__ = ('id', '_user')
+
+    def __init__(self, user_id):
+        """Constructor method to initialize the principal from the user id
+        """
+        self.id = user_id
+        self._user = None
+
+    @property
+    def user(self):
+        """The User row of the principal, loaded on first access
+        """
+        if self._user is None:
+            self._user = User.query.get(self.id)
+        return self._user
+
+    def __getattr__(self, name):
+        """Method to read any attribute other than the id from the User row
+        """
+        return getattr(self.user, name)
+
+    def __repr__(self):
+        """method simply tells Python how to print the principal"""
+        return "<UserPrincipal: {}>".format(self.id)
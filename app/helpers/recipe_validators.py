@@ -1,6 +1,9 @@
 from marshmallow import ValidationError
 import re
 
+# longest value the name, ingredients and methods columns hold
+MAX_LENGTH = 256
+
 
 def recipe_validation(recipe, *argv):
     error = None
@@ -24,3 +27,20 @@ def recipe_validation(recipe, *argv):
         if error:
             raise error
 
+
+def recipe_details_validation(*details):
+    """Validation method for ingredients or methods set without a recipe
+    name, which must hold more than white space and fit their columns
+    """
+    if not details or not all(re.sub(r'\s+', '', detail) for detail in details):
+        raise ValidationError('Kindly provide ingredients or methods')
+    recipe_length_validation(*details)
+
+
+def recipe_length_validation(*values):
+    """Validation method for values longer than the recipe columns hold
+    """
+    if any(len(value) > MAX_LENGTH for value in values):
+        raise ValidationError('Recipe values cannot be longer than {} characters'.format(
+            MAX_LENGTH))
+
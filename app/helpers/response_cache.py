@@ -0,0 +1,252 @@
+"""Server-side cache of GET responses, keyed by the collection version of
+the user so that every write of the user orphans them
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, request
+from app.helpers.envelope import wants_envelope
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis is only needed for the redis backend
+    redis = None
+
+
+class MemoryBackend(object):
+    """Bounded LRU of cached responses kept in the worker's memory
+
+    Every worker misses once a user's collection version moves on, but only
+    the worker a write happens on frees the user's old entries at once; the
+    others age out of the LRU or expire.
+    """
+
+    name = 'memory'
+
+    def __init__(self, max_size=1024):
+        """Constructor method to initialize the cache limit and storage
+        """
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Method to fetch a cached entry, None on a miss or once it expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl):
+        """Method to cache an entry for ttl seconds
+        """
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def forget(self, user_id):
+        """Method to free the cached entries of a user, which a write orphaned
+        """
+        with self._lock:
+            stale = [key for key in self._entries if key.startswith('{}:'.format(user_id))]
+            for key in stale:
+                del self._entries[key]
+
+    def size(self):
+        """Method to report the number of cached entries
+        """
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self):
+        """Method to drop every cached entry
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisBackend(object):
+    """Cached responses kept in redis, or anything speaking its protocol, and
+    shared by all workers
+
+    Only ``get`` and ``set`` with ``ex`` are used on the client, so a
+    stand-in with those methods can replace it.
+    """
+
+    name = 'redis'
+
+    def __init__(self, client, prefix='yummy:responses:'):
+        """Constructor method to initialize the client and key prefix
+        """
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        """Method to fetch a cached entry, None on a miss
+        """
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        if isinstance(value, bytes):
+            value = value.decode()
+        return json.loads(value)
+
+    def set(self, key, value, ttl):
+        """Method to cache an entry for ttl seconds
+        """
+        self.client.set(self.prefix + key, json.dumps(value), ex=ttl)
+
+    def forget(self, user_id):
+        """Method kept for the backend interface, orphaned entries expire on their own
+        """
+        pass
+
+    def size(self):
+        """Method to report the number of cached entries, unknown for redis
+        """
+        return None
+
+    def clear(self):
+        """Method kept for the backend interface, redis entries expire on their own
+        """
+        pass
+
+
+class ResponseCache(object):
+    """Cache of GET responses keyed by user, the user's collection version,
+    route and query args, and whether the v2 envelope was asked for
+    """
+
+    def __init__(self):
+        """Constructor method to initialize a disabled cache and its counters
+        """
+        self.backend = None
+        self.ttl = 60
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def configure(self, backend, ttl):
+        """Method to apply the backend and expiry from the app configuration,
+        a backend of None disables the cache
+        """
+        if self.backend is not None:
+            self.backend.clear()
+        self.backend = backend
+        self.ttl = ttl
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.invalidations = 0
+
+    def key(self, user_id):
+        """Method to build the cache key of the current request for a user,
+        reading the user's collection version, which every worker shares
+        """
+        from app.models import User
+        return '{}:{}:{}:{}'.format(user_id, User.get_collection_version(user_id),
+                                    int(wants_envelope()), request.full_path)
+
+    def get(self, key):
+        """Method to fetch the cached response under a key
+        """
+        entry = self.backend.get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def set(self, key, response):
+        """Method to cache a successful response under a key, which must be
+        the one built before the response was, so that a write meanwhile
+        leaves it under the old version
+        """
+        self.backend.set(key, {
+            'body': response.get_data(as_text=True),
+            'status': response.status_code,
+            'mimetype': response.mimetype,
+            'etag': response.get_etag()[0],
+            'vary': response.headers.get('Vary')
+        }, self.ttl)
+
+    def invalidate_user(self, user_id):
+        """Method to free the cached responses of a user after a write, which
+        moved the user on to a new collection version
+        """
+        if self.backend is None:
+            return
+        self.backend.forget(user_id)
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self):
+        """Method to report the cache backend, size and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': self.backend.name if self.backend else None,
+                'size': self.backend.size() if self.backend else 0,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+def make_backend(config):
+    """Method to build the cache backend named in the app configuration
+    """
+    name = config.get('RESPONSE_CACHE_BACKEND')
+    if name == 'memory':
+        return MemoryBackend(config['RESPONSE_CACHE_SIZE'])
+    if name == 'redis':
+        if redis is None:
+            raise RuntimeError('The redis response cache backend needs the redis package')
+        return RedisBackend(redis.StrictRedis.from_url(config['RESPONSE_CACHE_REDIS_URL']))
+    return None
+
+
+def cached_response(f):
+    """Decorator to serve a GET from the response cache of the current user
+    and to cache its successful responses
+    """
+    @wraps(f)
+    def decorated(view, current_user, *args, **kwargs):
+        if response_cache.backend is None:
+            return f(view, current_user, *args, **kwargs)
+        key = response_cache.key(current_user.id)
+        entry = response_cache.get(key)
+        if entry is None:
+            response = f(view, current_user, *args, **kwargs)
+            if isinstance(response, Response) and response.status_code == 200:
+                response_cache.set(key, response)
+            return response
+        if entry['etag'] and request.if_none_match.contains(entry['etag']):
+            response = Response(status=304)
+        else:
+            response = Response(entry['body'], status=entry['status'],
+                                mimetype=entry['mimetype'])
+        if entry['etag']:
+            response.set_etag(entry['etag'])
+        if entry['vary']:
+            response.headers['Vary'] = entry['vary']
+        return response
+    return decorated
+
+
+response_cache = ResponseCache()
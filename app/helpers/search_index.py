@@ -0,0 +1,381 @@
+"""In-process inverted index to search the recipes and categories of a user
+without the database
+"""
+import base64
+import bisect
+import gzip
+import json
+import math
+import re
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+
+SNAPSHOT_FORMAT = 'yummy-search-index'
+SNAPSHOT_VERSION = 1
+
+
+def tokenize(text):
+    """Method to split a text into lower case words
+    """
+    return re.findall(r'[^\W_]+', (text or '').lower())
+
+
+def encode_array(values):
+    """Method to write an array as base64 text for a snapshot
+    """
+    return base64.b64encode(values.tobytes()).decode()
+
+
+def decode_array(typecode, text, swap):
+    """Method to read an array back from a snapshot
+    """
+    values = array(typecode)
+    values.frombytes(base64.b64decode(text))
+    if swap:
+        values.byteswap()
+    return values
+
+
+class InvertedIndex(object):
+    """Inverted index of documents ranked with BM25
+
+    Each term maps to a sorted array of document ids and an array of the
+    term's frequency in each of them. Query words match every term they are
+    a prefix of, and a document must match all query words.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        """Constructor method to initialize an empty index
+        """
+        self.postings = {}
+        self.terms = []
+        self.lengths = {}
+        self.groups = {}
+        self.doc_terms = {}
+        self.total_length = 0
+
+    def add(self, doc_id, text, group=None):
+        """Method to index a document, replacing any earlier version of it
+        """
+        if doc_id in self.lengths:
+            self.remove(doc_id)
+        tokens = tokenize(text)
+        frequencies = {}
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+        for term, frequency in frequencies.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = (array('i'), array('H'))
+                bisect.insort(self.terms, term)
+            ids, tfs = posting
+            position = bisect.bisect_left(ids, doc_id)
+            ids.insert(position, doc_id)
+            tfs.insert(position, min(frequency, 65535))
+        self.lengths[doc_id] = len(tokens)
+        self.groups[doc_id] = group
+        self.doc_terms[doc_id] = tuple(frequencies)
+        self.total_length += len(tokens)
+
+    def remove(self, doc_id):
+        """Method to drop a document from the index
+        """
+        if doc_id not in self.lengths:
+            return
+        for term in self.doc_terms.pop(doc_id):
+            ids, tfs = self.postings[term]
+            position = bisect.bisect_left(ids, doc_id)
+            del ids[position]
+            del tfs[position]
+            if not ids:
+                del self.postings[term]
+                del self.terms[bisect.bisect_left(self.terms, term)]
+        self.total_length -= self.lengths.pop(doc_id)
+        del self.groups[doc_id]
+
+    def remove_group(self, group):
+        """Method to drop every document of a group, e.g. the recipes of a category
+        """
+        for doc_id in [doc_id for doc_id, doc_group in self.groups.items()
+                       if doc_group == group]:
+            self.remove(doc_id)
+
+    def expand(self, word):
+        """Method to find the indexed terms starting with a word
+        """
+        position = bisect.bisect_left(self.terms, word)
+        while position < len(self.terms) and self.terms[position].startswith(word):
+            yield self.terms[position]
+            position += 1
+
+    def search(self, text, group=None):
+        """Method to return the ids of the documents matching every word of
+        the text, best BM25 score first
+        """
+        words = set(tokenize(text))
+        if not words or not self.lengths:
+            return []
+        documents = len(self.lengths)
+        average_length = self.total_length / documents or 1
+        scores = None
+        for word in words:
+            word_scores = {}
+            for term in self.expand(word):
+                ids, tfs = self.postings[term]
+                idf = math.log(1 + (documents - len(ids) + 0.5) / (len(ids) + 0.5))
+                for doc_id, tf in zip(ids, tfs):
+                    if scores is not None and doc_id not in scores:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / average_length)
+                    word_scores[doc_id] = word_scores.get(doc_id, 0.0) + \
+                        idf * tf * (self.k1 + 1) / (tf + norm)
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {doc_id: scores[doc_id] + score
+                          for doc_id, score in word_scores.items()}
+            if not scores:
+                return []
+        if group is not None:
+            scores = {doc_id: score for doc_id, score in scores.items()
+                      if self.groups[doc_id] == group}
+        return sorted(scores, key=lambda doc_id: (-scores[doc_id], doc_id))
+
+    def to_dict(self):
+        """Method to turn the index into a snapshot record
+        """
+        return {'postings': {term: [encode_array(ids), encode_array(tfs)]
+                             for term, (ids, tfs) in self.postings.items()},
+                'lengths': [[doc_id, length, self.groups[doc_id]]
+                            for doc_id, length in self.lengths.items()]}
+
+    @staticmethod
+    def from_dict(record, swap=False):
+        """Method to rebuild an index from a snapshot record
+        """
+        index = InvertedIndex()
+        doc_terms = {}
+        for term, (ids, tfs) in record['postings'].items():
+            index.postings[term] = (decode_array('i', ids, swap), decode_array('H', tfs, swap))
+            for doc_id in index.postings[term][0]:
+                doc_terms.setdefault(doc_id, []).append(term)
+        index.terms = sorted(index.postings)
+        for doc_id, length, group in record['lengths']:
+            index.lengths[doc_id] = length
+            index.groups[doc_id] = group
+            index.doc_terms[doc_id] = tuple(doc_terms.get(doc_id, ()))
+            index.total_length += length
+        return index
+
+
+class UserIndex(object):
+    """Indexes of the recipes and categories of one user, as of a version of
+    the user's collection
+    """
+
+    def __init__(self, version):
+        """Constructor method to initialize empty indexes at a version
+        """
+        self.version = version
+        self.recipes = InvertedIndex()
+        self.categories = InvertedIndex()
+
+
+class SearchIndex(object):
+    """Bounded LRU of user indexes, kept up to date by the model hooks and
+    rebuilt from the database when a user's collection version moved on
+    without them, e.g. after a bulk request or a write in another worker
+    """
+
+    def __init__(self, max_users=256):
+        """Constructor method to initialize a disabled index and its counters
+        """
+        self.enabled = False
+        self.max_users = max_users
+        self.builds = 0
+        self.updates = 0
+        self.searches = 0
+        self._users = OrderedDict()
+        self._lock = threading.RLock()
+
+    def configure(self, enabled, max_users):
+        """Method to apply the backend choice and limit from the app configuration
+        """
+        with self._lock:
+            self.enabled = enabled
+            self.max_users = max_users
+            self._users.clear()
+            self.builds = 0
+            self.updates = 0
+            self.searches = 0
+
+    def build(self, user_id):
+        """Method to index all recipes and categories of a user from the database
+        """
+        from app.models import User, Categories, Recipes
+        user_index = UserIndex(User.get_collection_version(user_id))
+        for recipe in Recipes.search_documents(user_id):
+            user_index.recipes.add(recipe.id, ' '.join((
+                recipe.recipe_name, recipe.recipe_ingredients, recipe.recipe_methods)),
+                                   recipe.category_id)
+        for category in Categories.search_documents(user_id):
+            user_index.categories.add(category.id, category.category_name)
+        return user_index
+
+    def user_index(self, user_id):
+        """Method to fetch the index of a user, building it when it is missing
+        or older than the user's collection
+        """
+        from app.models import User
+        version = User.get_collection_version(user_id)
+        with self._lock:
+            user_index = self._users.get(user_id)
+            if user_index is not None and user_index.version == version:
+                self._users.move_to_end(user_id)
+                self.searches += 1
+                return user_index
+        user_index = self.build(user_id)
+        with self._lock:
+            self.builds += 1
+            self.searches += 1
+            self._remember(user_id, user_index)
+        return user_index
+
+    def _remember(self, user_id, user_index):
+        """Keeps a user index, dropping the least recently used ones
+        """
+        self._users[user_id] = user_index
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    def search_recipes(self, user_id, category_id, text):
+        """Method to return the ids of a user's recipes in a category matching
+        the text, best match first
+        """
+        user_index = self.user_index(user_id)
+        with self._lock:
+            return user_index.recipes.search(text, category_id)
+
+    def recipe_categories(self, user_id, recipe_ids):
+        """Method to count the given recipes of a user in each category
+        """
+        user_index = self.user_index(user_id)
+        counts = {}
+        with self._lock:
+            for recipe_id in recipe_ids:
+                category_id = user_index.recipes.groups.get(recipe_id)
+                counts[category_id] = counts.get(category_id, 0) + 1
+        return counts
+
+    def search_categories(self, user_id, text):
+        """Method to return the ids of a user's categories matching the text,
+        best match first
+        """
+        user_index = self.user_index(user_id)
+        with self._lock:
+            return user_index.categories.search(text)
+
+    def apply(self, user_id, version, change):
+        """Method to apply a write that moved a user's collection to version
+        to the user's index, which is dropped when it missed an earlier write
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            user_index = self._users.get(user_id)
+            if user_index is None:
+                return
+            if user_index.version != version - 1:
+                del self._users[user_id]
+                return
+            change(user_index)
+            user_index.version = version
+            self.updates += 1
+
+    def recipe_saved(self, user_id, version, recipe_id, text, category_id):
+        """Method to index a created or edited recipe
+        """
+        self.apply(user_id, version, lambda user_index: user_index.recipes.add(
+            recipe_id, text, category_id))
+
+    def recipe_deleted(self, user_id, version, recipe_id):
+        """Method to drop a deleted recipe from the index
+        """
+        self.apply(user_id, version, lambda user_index: user_index.recipes.remove(recipe_id))
+
+    def category_saved(self, user_id, version, category_id, category_name):
+        """Method to index a created or renamed category
+        """
+        self.apply(user_id, version, lambda user_index: user_index.categories.add(
+            category_id, category_name))
+
+    def category_deleted(self, user_id, version, category_id):
+        """Method to drop a deleted category and its recipes from the index
+        """
+        def change(user_index):
+            user_index.categories.remove(category_id)
+            user_index.recipes.remove_group(category_id)
+        self.apply(user_id, version, change)
+
+    def snapshot(self, path, user_ids=None):
+        """Method to write the indexes of the given users, by default the
+        cached ones, to a gzipped snapshot file and return how many were written
+        """
+        with self._lock:
+            cached = dict(self._users)
+        written = 0
+        with gzip.open(path, 'wt', encoding='utf-8') as snapshot:
+            snapshot.write(json.dumps({'format': SNAPSHOT_FORMAT, 'version': SNAPSHOT_VERSION,
+                                       'byteorder': sys.byteorder}) + '\n')
+            for user_id in (cached if user_ids is None else user_ids):
+                user_index = cached.get(user_id) or self.build(user_id)
+                snapshot.write(json.dumps({'user_id': user_id,
+                                           'version': user_index.version,
+                                           'recipes': user_index.recipes.to_dict(),
+                                           'categories': user_index.categories.to_dict()}) + '\n')
+                written += 1
+        return written
+
+    def restore(self, path):
+        """Method to load the user indexes of a snapshot file, which are
+        checked against the database like any other on their first search
+        """
+        restored = 0
+        with gzip.open(path, 'rt', encoding='utf-8') as snapshot:
+            header = json.loads(snapshot.readline())
+            if header.get('format') != SNAPSHOT_FORMAT or \
+                    header.get('version') != SNAPSHOT_VERSION:
+                raise ValueError('{} is not a search index snapshot'.format(path))
+            swap = header['byteorder'] != sys.byteorder
+            for line in snapshot:
+                record = json.loads(line)
+                user_index = UserIndex(record['version'])
+                user_index.recipes = InvertedIndex.from_dict(record['recipes'], swap)
+                user_index.categories = InvertedIndex.from_dict(record['categories'], swap)
+                with self._lock:
+                    self._remember(record['user_id'], user_index)
+                restored += 1
+        return restored
+
+    def stats(self):
+        """Method to report the number of indexed users and how often the
+        indexes were searched, rebuilt and updated in place
+        """
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'users': len(self._users),
+                'max_users': self.max_users,
+                'searches': self.searches,
+                'builds': self.builds,
+                'updates': self.updates
+            }
+
+
+search_index = SearchIndex()
@@ -0,0 +1,117 @@
+"""In-process cache of verified access tokens
+"""
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+
+
+class TokenCache(object):
+    """Bounded LRU cache mapping an access token to the id of its user
+
+    Entries expire at the token's own ``exp`` claim. When ``max_age`` is set
+    they expire after that many seconds at the latest, which bounds how long
+    another worker process keeps trusting a token that was logged out elsewhere.
+    """
+
+    # number of least recently used entries checked for expiry on each write
+    purge_batch = 32
+
+    def __init__(self, max_size=1024, max_age=None):
+        """Constructor method to initialize the cache limits and counters
+        """
+        self.max_size = max_size
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.purged = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, max_size, max_age=None):
+        """Method to apply the limits from the app configuration
+        """
+        self.clear()
+        with self._lock:
+            self.max_size = max_size
+            self.max_age = max_age
+
+    def get(self, token):
+        """Method to fetch the user id of a verified token, None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, token, user_id, expires_at):
+        """Method to remember a token verified for a user until it expires
+        """
+        if not self.max_size:
+            return
+        if self.max_age is not None:
+            expires_at = min(expires_at, time.time() + self.max_age)
+        with self._lock:
+            self._entries[token] = (user_id, expires_at)
+            self._entries.move_to_end(token)
+            self._purge_expired(self.purge_batch)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _purge_expired(self, batch_size):
+        """Drops expired entries among the batch_size least recently used ones
+        """
+        now = time.time()
+        expired = [token for token, entry in islice(self._entries.items(), batch_size)
+                   if entry[1] <= now]
+        for token in expired:
+            del self._entries[token]
+        self.purged += len(expired)
+
+    def invalidate(self, token):
+        """Method to drop a token from the cache, e.g. when it is logged out
+        """
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def invalidate_user(self, user_id):
+        """Method to drop every cached token of a user once they are revoked
+        """
+        with self._lock:
+            revoked = [token for token, entry in self._entries.items()
+                       if entry[0] == user_id]
+            for token in revoked:
+                del self._entries[token]
+
+    def clear(self):
+        """Method to empty the cache and reset its counters
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.purged = 0
+
+    def stats(self):
+        """Method to report the cache size and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'purged': self.purged,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+verified_tokens = TokenCache()
@@ -1,10 +1,21 @@
 """Stores all models from the user to categories and recipes
 """
 from app import db
-from flask_bcrypt import Bcrypt
 from datetime import datetime, timedelta
 import jwt
 import os
+import re
+from sqlalchemy import event
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.dialects.postgresql import TSVECTOR, insert as pg_insert
+from app.helpers.token_cache import verified_tokens
+from app.helpers.response_cache import response_cache
+from app.helpers.search_index import search_index
+from app.helpers.pantry_index import pantry_index
+from app.helpers.ingredients import parse_ingredients
+from app.helpers.facets import GroupingSets
+from app.helpers.hashing import generate_password_hash, check_password_hash, \
+    hash_needs_update
 
 
 class User(db.Model):
@@ -16,6 +27,15 @@ class User(db.Model):
     username = db.Column(db.String(256))
     secret_word = db.Column(db.String(256))
     password = db.Column(db.String(256), nullable=False)
+    # bumped on logout and password reset to revoke every token issued before
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # kept up to date by saving and deleting categories and recipes, so page
+    # totals do not need a COUNT(*)
+    category_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    recipe_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # bumped on every write to the user's categories and recipes, used to
+    # tell clients whether their copy of a listing is still current
+    collection_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     # Delete all the categories that belong to a user if the owner is deleted from the db
     categories = db.relationship(
         'Categories', order_by='Categories.id', cascade="all, delete-orphan")
@@ -26,23 +46,37 @@ class User(db.Model):
         variables, username, password, secret_word and email
         """
         self.email = email
-        self.password = Bcrypt().generate_password_hash(password).decode()
+        self.password = generate_password_hash(password)
         self.username = username
-        self.secret_word = Bcrypt().generate_password_hash(secret_word).decode()
+        self.secret_word = generate_password_hash(secret_word)
 
     def password_check(self, password):
         """
         validates if stored password is the user
          password by comparing the hashed and the provided password
          """
-        return Bcrypt().check_password_hash(self.password, password)
+        return check_password_hash(self.password, password)
 
     def secret_word_check(self, secret_word):
         """
         validates if stored password is the user
         password by comparing secret_word hashed and the provided secret word
          """
-        return Bcrypt().check_password_hash(self.secret_word, secret_word)
+        return check_password_hash(self.secret_word, secret_word)
+
+    def password_needs_rehash(self):
+        """
+        checks if the stored password should move to the configured
+        bcrypt cost, see hash_needs_update
+        """
+        return hash_needs_update(self.password)
+
+    def secret_word_needs_rehash(self):
+        """
+        checks if the stored secret word should move to the configured
+        bcrypt cost, see hash_needs_update
+        """
+        return hash_needs_update(self.secret_word)
 
     def save(self):
         """
@@ -52,23 +86,78 @@ class User(db.Model):
         db.session.add(self)
         db.session.commit()
 
+    def revoke_tokens(self):
+        """
+        Invalidates all access tokens issued to the user so far
+        by moving the user on to the next token version
+        """
+        self.token_version = User.token_version + 1
+        self.save()
+        verified_tokens.invalidate_user(self.id)
+
+    @staticmethod
+    def record_write(user_id, categories=0, recipes=0):
+        """
+        Records a change to the categories or recipes of a user as part of
+        the current transaction, adding to the user's counters and moving the
+        user on to the next collection version, which is returned
+        """
+        return db.session.execute(User.__table__.update().where(User.id == user_id).values(
+            category_count=User.category_count + categories,
+            recipe_count=User.recipe_count + recipes,
+            collection_version=User.collection_version + 1).returning(
+                User.collection_version)).scalar()
+
+    @staticmethod
+    def get_collection_version(user_id):
+        """
+        Reads the version of a user's categories and recipes, which
+        changes with every write to them
+        """
+        return db.session.query(User.collection_version).filter_by(id=user_id).scalar()
+
+    @staticmethod
+    def reconcile_counters():
+        """
+        Recounts the category and recipe counters of all users and
+        categories, returns how many rows had drifted
+        """
+        recipe_total = db.session.query(db.func.count(Recipes.id)).filter(
+            Recipes.category_id == Categories.id).as_scalar()
+        categories_fixed = Categories.query.filter(
+            Categories.recipe_count != recipe_total).update(
+                {Categories.recipe_count: recipe_total}, synchronize_session=False)
+        category_total = db.session.query(db.func.count(Categories.id)).filter(
+            Categories.created_by == User.id).as_scalar()
+        user_recipe_total = db.session.query(db.func.count(Recipes.id)).filter(
+            Recipes.created_by == User.id).as_scalar()
+        users_fixed = User.query.filter(db.or_(
+            User.category_count != category_total,
+            User.recipe_count != user_recipe_total)).update(
+                {User.category_count: category_total,
+                 User.recipe_count: user_recipe_total}, synchronize_session=False)
+        db.session.commit()
+        return {'users': users_fixed, 'categories': categories_fixed}
+
     @staticmethod
     def password_hash(password):
         """method to hash provided password
         """
-        password = Bcrypt().generate_password_hash(password).decode()
+        password = generate_password_hash(password)
         return password
 
     @staticmethod
-    def user_token_generator(user_id):
+    def user_token_generator(user_id, token_version=0):
         """" Method to generate a token for user identification """
         app_secret = os.getenv('SECRET', '#%$#%$^FDFGFGdf')
         try:
-            # set up a payload with an expiration time
+            # set up a payload with an expiration time and the token version
+            # the token stays valid for
             token_payload = {
                 'exp': datetime.utcnow() + timedelta(hours=4),
                 'iat': datetime.utcnow(),
-                'usr': user_id
+                'usr': user_id,
+                'ver': token_version
             }
             # byte string token created with the payload and the SECRET key
             jwt_string = jwt.encode(
@@ -84,16 +173,30 @@ class User(db.Model):
     @staticmethod
     def decode_token(token):
         """Method to decode the provided token"""
+        payload = User.decode_token_claims(token)
+        if isinstance(payload, dict):
+            return payload['usr']
+        return payload
+
+    @staticmethod
+    def decode_token_claims(token):
+        """Method to decode the provided token and return all of its claims"""
         app_secret = os.getenv('SECRET', '#%$#%$^FDFGFGdf')
         try:
-            payload = jwt.decode(token, app_secret)
-            return payload['usr']
+            return jwt.decode(token, app_secret)
         except jwt.ExpiredSignatureError:
             return "Expired token. Please login to get a new token"
         except jwt.InvalidTokenError:
             return "Invalid token. Please register or login"
 
 
+def contains_pattern(search):
+    """Returns the LIKE pattern of names containing the search term, with
+    its wildcards escaped so a bulk request only picks literal matches
+    """
+    return '%' + re.sub(r'([\\%_])', r'\\\1', search) + '%'
+
+
 class Categories(db.Model):
     """ Class to define the recipe categories table layout in the db """
 
@@ -106,9 +209,20 @@ class Categories(db.Model):
         db.DateTime, default=db.func.current_timestamp(),
         onupdate=db.func.current_timestamp())
     created_by = db.Column(db.Integer, db.ForeignKey(User.id))
+    # kept up to date by saving and deleting recipes of the category
+    recipe_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # checked and bumped by every update so concurrent edits cannot overwrite each other
+    version = db.Column(db.Integer, nullable=False, server_default='1')
     recipes = db.relationship(
         'Recipes', order_by='Recipes.id', cascade="all, delete-orphan")
 
+    __mapper_args__ = {'version_id_col': version}
+    # the pg_trgm index of category names for fuzzy search is only created by
+    # the migrations, since it needs the pg_trgm extension
+    __table_args__ = (
+        db.Index('ix_categories_created_by_category_name', 'created_by', 'category_name'),
+    )
+
     def __init__(self, category_name, created_by):
         """
         Constructor to initialize the class variables, category
@@ -121,8 +235,12 @@ class Categories(db.Model):
         """
         method to save a category name both on update and creation
         """
+        version = User.record_write(self.created_by, categories=1 if self.id is None else 0)
         db.session.add(self)
         db.session.commit()
+        response_cache.invalidate_user(self.created_by)
+        search_index.category_saved(self.created_by, version, self.id, self.category_name)
+        pantry_index.category_saved(self.created_by, version)
 
     @staticmethod
     def get_all_user_categories(user_id):
@@ -132,16 +250,116 @@ class Categories(db.Model):
         """
         return Categories.query.filter_by(created_by=user_id)
 
+    @staticmethod
+    def search_documents(user_id):
+        """
+        This method fetches the names of all categories of a user
+        for the in-process search index
+        """
+        return db.session.query(Categories.id, Categories.category_name).filter_by(
+            created_by=user_id).yield_per(1000)
+
+    @staticmethod
+    def fuzzy_search(user_id, search, threshold):
+        """
+        This method fetches the categories of a user whose name is at
+        least threshold similar to the search by pg_trgm, and returns the
+        query with the similarity of each match
+        """
+        # the % operator compares against this setting, which keeps it indexed
+        db.session.execute(db.select([db.func.set_config(
+            'pg_trgm.similarity_threshold', str(threshold), True)]))
+        query = Categories.query.filter(Categories.created_by == user_id,
+                                        Categories.category_name.op('%%')(search))
+        return query, db.func.similarity(Categories.category_name, search)
+
+    @staticmethod
+    def count_user_categories(user_id):
+        """
+        This method reads the number of categories of a user
+        from the user's category counter
+        """
+        return db.session.query(User.category_count).filter_by(id=user_id).scalar() or 0
+
+    @staticmethod
+    def update_recipe_count(category_id, recipes):
+        """
+        Adds to the recipe counter of a category as part
+        of the current transaction
+        """
+        Categories.query.filter_by(id=category_id).update(
+            {Categories.recipe_count: Categories.recipe_count + recipes},
+            synchronize_session=False)
+
+    @staticmethod
+    def bulk_filter(user_id, ids=None, search=None):
+        """
+        Builds the condition picking the categories of a user for a bulk
+        request, by id or by name
+        """
+        condition = Categories.created_by == user_id
+        if ids is not None:
+            return db.and_(condition, Categories.id.in_(ids))
+        return db.and_(condition, Categories.category_name.ilike(
+            contains_pattern(search), escape='\\'))
+
+    @staticmethod
+    def bulk_delete(user_id, ids=None, search=None):
+        """
+        Deletes the picked categories of a user and their recipes with one
+        DELETE per table in one transaction and returns the deleted ids
+        """
+        condition = Categories.bulk_filter(user_id, ids, search)
+        db.session.execute(Recipes.__table__.delete().where(Recipes.category_id.in_(
+            db.select([Categories.id]).where(condition))))
+        deleted = db.session.execute(Categories.__table__.delete().where(condition).returning(
+            Categories.id, Categories.recipe_count)).fetchall()
+        if deleted:
+            User.record_write(user_id, categories=-len(deleted),
+                              recipes=-sum(row.recipe_count for row in deleted))
+        db.session.commit()
+        response_cache.invalidate_user(user_id)
+        return sorted(row.id for row in deleted)
+
+    @staticmethod
+    def export_rows(user_id):
+        """
+        This method fetches every category of a user joined with its
+        recipes, ordered by category, through a server-side cursor
+        """
+        return db.session.query(
+            Categories.id, Categories.category_name,
+            Categories.date_created, Categories.date_modified,
+            Recipes.id.label('recipe_id'), Recipes.recipe_name,
+            Recipes.recipe_ingredients, Recipes.recipe_methods,
+            Recipes.date_created.label('recipe_date_created'),
+            Recipes.date_modified.label('recipe_date_modified')).outerjoin(
+                Recipes, Recipes.category_id == Categories.id).filter(
+                    Categories.created_by == user_id).order_by(
+                        Categories.id, Recipes.id).yield_per(1000)
+
     def delete_categories(self):
         """This method deletes a recipe category belonging to a user"""
+        user_id, category_id = self.created_by, self.id
+        version = User.record_write(user_id, categories=-1, recipes=-self.recipe_count)
         db.session.delete(self)
         db.session.commit()
+        response_cache.invalidate_user(user_id)
+        search_index.category_deleted(user_id, version, category_id)
+        pantry_index.category_deleted(user_id, version, category_id)
 
     def __repr__(self):
         """method simply tells Python how to print objects of the Category class"""
         return "<Categories: {}>".format(self.category_name)
 
 
+# weighted words of a recipe kept in recipes.search_vector by Postgres
+RECIPE_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(recipe_name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(recipe_ingredients, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(recipe_methods, '')), 'C')")
+
+
 class Recipes(db.Model):
     """Class to define the recipe categories table layout in the db"""
 
@@ -156,6 +374,18 @@ class Recipes(db.Model):
         onupdate=db.func.current_timestamp())
     created_by = db.Column(db.Integer, db.ForeignKey(User.id))
     category_id = db.Column(db.Integer, db.ForeignKey(Categories.id))
+    # checked and bumped by every update so concurrent edits cannot overwrite each other
+    version = db.Column(db.Integer, nullable=False, server_default='1')
+    # generated by Postgres from RECIPE_SEARCH_VECTOR, never written by the app
+    search_vector = db.deferred(db.Column(TSVECTOR, server_default=db.FetchedValue(),
+                                          server_onupdate=db.FetchedValue()))
+
+    __mapper_args__ = {'version_id_col': version}
+    __table_args__ = (
+        db.Index('ix_recipes_category_id_recipe_name', 'category_id', 'recipe_name'),
+        db.Index('ix_recipes_created_by_id', 'created_by', 'id'),
+        db.Index('ix_recipes_category_id_id', 'category_id', 'id'),
+    )
 
     def __init__(self, recipe_name, recipe_ingredients, recipe_methods, category_id, created_by):
         """
@@ -172,8 +402,165 @@ class Recipes(db.Model):
         """
         method to save a category name both on update and creation
         """
+        relink = self.id is None or \
+            sa_inspect(self).attrs.recipe_ingredients.history.has_changes()
+        if self.id is None:
+            Categories.update_recipe_count(self.category_id, 1)
+        version = User.record_write(self.created_by, recipes=1 if self.id is None else 0)
         db.session.add(self)
+        if relink:
+            db.session.flush()
+            Ingredients.link_recipes([(self.id, self.recipe_ingredients)])
         db.session.commit()
+        response_cache.invalidate_user(self.created_by)
+        search_index.recipe_saved(self.created_by, version, self.id, ' '.join((
+            self.recipe_name, self.recipe_ingredients, self.recipe_methods)), self.category_id)
+        pantry_index.recipe_saved(self.created_by, version, self.id,
+                                  parse_ingredients(self.recipe_ingredients), self.category_id)
+
+    @staticmethod
+    def bulk_create(recipes, category_id, created_by):
+        """
+        Inserts many recipes of a category with one INSERT in one
+        transaction, updating the counters once, and returns the new
+        recipe rows in the order given
+        """
+        rows = [dict(recipe, category_id=category_id, created_by=created_by)
+                for recipe in recipes]
+        created = db.session.execute(
+            Recipes.__table__.insert().values(rows).returning(
+                Recipes.id, Recipes.recipe_name, Recipes.recipe_ingredients,
+                Recipes.recipe_methods, Recipes.category_id,
+                Recipes.date_created, Recipes.date_modified)).fetchall()
+        Ingredients.link_recipes([(row.id, row.recipe_ingredients) for row in created])
+        Categories.update_recipe_count(category_id, len(rows))
+        User.record_write(created_by, recipes=len(rows))
+        db.session.commit()
+        response_cache.invalidate_user(created_by)
+        return created
+
+    @staticmethod
+    def existing_recipe_names(category_id, created_by, recipe_names):
+        """
+        This method fetches which of the given recipe names
+        a user already has in a category
+        """
+        return {name for name, in db.session.query(Recipes.recipe_name).filter(
+            Recipes.category_id == category_id, Recipes.created_by == created_by,
+            Recipes.recipe_name.in_(recipe_names))}
+
+    @staticmethod
+    def bulk_filter(category_id, user_id, ids=None, search=None):
+        """
+        Builds the condition picking the recipes of a user in a category
+        for a bulk request, by id or by name
+        """
+        condition = db.and_(Recipes.category_id == category_id,
+                            Recipes.created_by == user_id)
+        if ids is not None:
+            return db.and_(condition, Recipes.id.in_(ids))
+        return db.and_(condition, Recipes.recipe_name.ilike(
+            contains_pattern(search), escape='\\'))
+
+    @staticmethod
+    def bulk_update(category_id, user_id, values, ids=None, search=None):
+        """
+        Updates the picked recipes with one UPDATE, moving each of them on
+        to its next version, and returns the updated ids
+        """
+        updated = db.session.execute(Recipes.__table__.update().where(
+            Recipes.bulk_filter(category_id, user_id, ids, search)).values(
+                dict(values, version=Recipes.version + 1)).returning(Recipes.id)).fetchall()
+        if updated and 'recipe_ingredients' in values:
+            Ingredients.link_recipes([(row.id, values['recipe_ingredients'])
+                                      for row in updated])
+        if updated:
+            User.record_write(user_id)
+        db.session.commit()
+        response_cache.invalidate_user(user_id)
+        return sorted(row.id for row in updated)
+
+    @staticmethod
+    def bulk_delete(category_id, user_id, ids=None, search=None):
+        """
+        Deletes the picked recipes with one DELETE and returns the deleted ids
+        """
+        deleted = db.session.execute(Recipes.__table__.delete().where(
+            Recipes.bulk_filter(category_id, user_id, ids, search)).returning(
+                Recipes.id)).fetchall()
+        if deleted:
+            Categories.update_recipe_count(category_id, -len(deleted))
+            User.record_write(user_id, recipes=-len(deleted))
+        db.session.commit()
+        response_cache.invalidate_user(user_id)
+        return sorted(row.id for row in deleted)
+
+    @staticmethod
+    def search_documents(user_id):
+        """
+        This method fetches the text of all recipes of a user
+        for the in-process search index
+        """
+        return db.session.query(Recipes.id, Recipes.category_id, Recipes.recipe_name,
+                                Recipes.recipe_ingredients, Recipes.recipe_methods).filter_by(
+                                    created_by=user_id).yield_per(1000)
+
+    @staticmethod
+    def full_text_search(user_id, search, category_id=None):
+        """
+        This method fetches the recipes of a user, in one category when
+        given, whose name, ingredients or methods hold words starting with
+        every word searched, and returns the query with the rank of each
+        match, or no rank when the search holds no words to match
+        """
+        words = re.findall(r'[^\W_]+', search)
+        query = Recipes.query.filter(Recipes.created_by == user_id)
+        if category_id is not None:
+            query = query.filter(Recipes.category_id == category_id)
+        if not words:
+            return query.filter(db.false()), None
+        tsquery = db.func.to_tsquery('english', ' & '.join(word + ':*' for word in words))
+        return query.filter(Recipes.search_vector.op('@@')(tsquery)), \
+            db.func.ts_rank(Recipes.search_vector, tsquery)
+
+    @staticmethod
+    def search_facets(query, facets, date_bucket='month'):
+        """
+        This method counts the recipes a query finds in all, in each
+        category and in each date bucket of their creation, with one
+        aggregate over grouping sets
+        """
+        bucket = db.func.date_trunc(db.literal_column("'{}'".format(date_bucket)),
+                                    Recipes.date_created)
+        columns = [db.func.count(Recipes.id).label('count')]
+        sets = [()]
+        if 'category' in facets:
+            columns += [Recipes.category_id, Categories.category_name,
+                        db.func.grouping(Recipes.category_id).label('by_category')]
+            sets.append((Recipes.category_id, Categories.category_name))
+            query = query.join(Categories, Categories.id == Recipes.category_id)
+        if 'date' in facets:
+            columns += [bucket.label('bucket'), db.func.grouping(bucket).label('by_date')]
+            sets.append((bucket,))
+        result = {'total': 0}
+        if 'category' in facets:
+            result['categories'] = []
+        if 'date' in facets:
+            result['dates'] = []
+        for row in query.with_entities(*columns).group_by(GroupingSets(*sets)):
+            if 'category' in facets and row.by_category == 0:
+                result['categories'].append({'category_id': row.category_id,
+                                             'category_name': row.category_name,
+                                             'count': row.count})
+            elif 'date' in facets and row.by_date == 0:
+                result['dates'].append({'date': row.bucket, 'count': row.count})
+            else:
+                result['total'] = row.count
+        if 'category' in facets:
+            result['categories'].sort(key=lambda facet: (-facet['count'], facet['category_id']))
+        if 'date' in facets:
+            result['dates'].sort(key=lambda facet: facet['date'])
+        return result
 
     @staticmethod
     def get_all_user_recipes(category_id):
@@ -183,41 +570,134 @@ class Recipes(db.Model):
         """
         return Recipes.query.filter_by(category_id=category_id)
 
+    @staticmethod
+    def first_recipes_of_categories(category_ids, limit):
+        """
+        This method fetches the first recipes of each of the given
+        categories in one query, ordered by category and id, reading
+        only the first rows of each category from its (category_id, id) index
+        """
+        if not category_ids:
+            return []
+        page = db.select([Categories.id]).where(Categories.id.in_(category_ids)).alias('page')
+        columns = [column for column in Recipes.__table__.c if column.key != 'search_vector']
+        first = db.select(columns).where(Recipes.category_id == page.c.id).order_by(
+            Recipes.id).limit(limit).lateral('first_recipes')
+        return db.session.execute(db.select([first]).select_from(
+            page.join(first, db.true())).order_by(first.c.category_id, first.c.id)).fetchall()
+
+    @staticmethod
+    def count_category_recipes(category_id):
+        """
+        This method reads the number of recipes in a category
+        from the category's recipe counter
+        """
+        return db.session.query(Categories.recipe_count).filter_by(
+            id=category_id).scalar() or 0
+
     def delete_recipes(self):
         """ This method deletes a recipe category belonging to a user """
+        Categories.update_recipe_count(self.category_id, -1)
+        user_id, recipe_id = self.created_by, self.id
+        version = User.record_write(user_id, recipes=-1)
         db.session.delete(self)
         db.session.commit()
+        response_cache.invalidate_user(user_id)
+        search_index.recipe_deleted(user_id, version, recipe_id)
+        pantry_index.recipe_deleted(user_id, version, recipe_id)
 
     def __repr__(self):
         """method simply tells Python how to print objects of the Category class"""
         return "<Recipes: {}>".format(self.recipe_name)
 
 
-class Sessions(db.Model):
-    """Class to store user login sessions
-    """
-    __tablename__ = 'token_blacklist'
+class Ingredients(db.Model):
+    """Class to define the ingredients table, one row per distinct
+    ingredient name found in the recipes"""
+
+    __tablename__ = 'ingredients'
     id = db.Column(db.Integer, primary_key=True)
-    auth_token = db.Column(db.String(256), nullable=False, unique=True)
-    date_created = db.Column(db.DateTime, default=db.func.current_timestamp())
+    name = db.Column(db.String(256), nullable=False, unique=True)
 
-    def __init__(self, auth_token):
-        """Constructor method for sesions class
+    @staticmethod
+    def link_recipes(recipes):
         """
-        self.auth_token = auth_token
+        Replaces the ingredients of the given (recipe id, ingredients text)
+        pairs in the current transaction, adding the ingredient names
+        that are new with one INSERT
+        """
+        links = {recipe_id: parse_ingredients(text) for recipe_id, text in recipes}
+        if not links:
+            return
+        names = {name for recipe_names in links.values() for name in recipe_names}
+        if names:
+            db.session.execute(pg_insert(Ingredients.__table__).values(
+                [{'name': name} for name in sorted(names)]).on_conflict_do_nothing(
+                    index_elements=['name']))
+        db.session.execute(RecipeIngredients.__table__.delete().where(
+            RecipeIngredients.recipe_id.in_(links)))
+        if names:
+            ingredient_ids = dict(db.session.query(Ingredients.name, Ingredients.id).filter(
+                Ingredients.name.in_(names)))
+            db.session.execute(RecipeIngredients.__table__.insert().values(
+                [{'recipe_id': recipe_id, 'ingredient_id': ingredient_ids[name]}
+                 for recipe_id, recipe_names in links.items() for name in recipe_names]))
 
     @staticmethod
-    def check_logout_status(auth_token):
-        """Method to check if a user is logged out
+    def recipes_with(user_id, names, match_all=True):
+        """
+        This method fetches the recipes of a user listing all, or with
+        match_all False any, of the given ingredient names, grouping only
+        the ingredient rows of the user's own recipes
         """
-        logout_state = Sessions.query.filter_by(auth_token=auth_token).first()
-        if logout_state:
-            return True
-        else:
-            return False
+        matches = db.session.query(RecipeIngredients.recipe_id).join(
+            Ingredients, Ingredients.id == RecipeIngredients.ingredient_id).join(
+                Recipes, Recipes.id == RecipeIngredients.recipe_id).filter(
+                    Ingredients.name.in_(names), Recipes.created_by == user_id)
+        if match_all:
+            matches = matches.group_by(RecipeIngredients.recipe_id).having(
+                db.func.count(RecipeIngredients.ingredient_id) == len(set(names)))
+        return Recipes.query.filter(Recipes.created_by == user_id,
+                                    Recipes.id.in_(matches.subquery()))
 
-    def save(self):
-        """Method to save the sessions or to update the db sessions
+    @staticmethod
+    def pantry_documents(user_id):
         """
-        db.session.add(self)
-        db.session.commit()
+        This method fetches the ingredient names of all recipes of a user,
+        grouped by recipe, for the in-process pantry index
+        """
+        return db.session.query(
+            RecipeIngredients.recipe_id, Recipes.category_id, Ingredients.name).join(
+                Recipes, Recipes.id == RecipeIngredients.recipe_id).join(
+                    Ingredients, Ingredients.id == RecipeIngredients.ingredient_id).filter(
+                        Recipes.created_by == user_id).order_by(
+                            RecipeIngredients.recipe_id).yield_per(1000)
+
+    def __repr__(self):
+        """method simply tells Python how to print objects of the Ingredients class"""
+        return "<Ingredients: {}>".format(self.name)
+
+
+class RecipeIngredients(db.Model):
+    """Class to define which ingredients each recipe lists"""
+
+    __tablename__ = 'recipe_ingredients'
+    recipe_id = db.Column(db.Integer, db.ForeignKey(Recipes.id, ondelete='CASCADE'),
+                          primary_key=True)
+    ingredient_id = db.Column(db.Integer, db.ForeignKey(Ingredients.id, ondelete='CASCADE'),
+                              primary_key=True)
+
+    # the primary key serves lookups by recipe, this index the ones by ingredient
+    __table_args__ = (
+        db.Index('ix_recipe_ingredients_ingredient_id_recipe_id',
+                 'ingredient_id', 'recipe_id'),
+    )
+
+
+# create_all makes search_vector a plain column, turn it into the generated
+# one the migrations create
+event.listen(Recipes.__table__, 'after_create', db.DDL(
+    'ALTER TABLE recipes DROP COLUMN search_vector, '
+    'ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({}) STORED; '
+    'CREATE INDEX ix_recipes_search_vector ON recipes USING gin (search_vector)'.format(
+        RECIPE_SEARCH_VECTOR)).execute_if(dialect='postgresql'))
@@ -10,6 +10,47 @@ class Config(object):
     CSRF_ENABLED = True
     SECRET = os.getenv('SECRET', '#%$#%$^FDFGFGdf')
     SQLALCHEMY_DATABASE_URI = 'postgresql://postgres:@localhost:5432/flask_api'
+    # verified access tokens kept in memory per worker, and the longest
+    # time in seconds a worker trusts one before checking the db again
+    TOKEN_CACHE_SIZE = 4096
+    TOKEN_CACHE_MAX_AGE = 300
+    # secret to send as the Authorization header of /metrics, which is
+    # not served at all while it is unset
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+    # threads hashing passwords per worker, how many more hashes may wait for
+    # them, and the Retry-After in seconds sent when the queue is full; sized
+    # so that hashes hold at most half of the 16 threads of a Procfile worker
+    BCRYPT_POOL_WORKERS = 2
+    BCRYPT_POOL_QUEUE_SIZE = 6
+    BCRYPT_POOL_RETRY_AFTER = 1
+    # bcrypt cost factor, see `python manage.py calibrate_bcrypt`
+    BCRYPT_LOG_ROUNDS = 12
+    # let logins rehash stored hashes down to a lower BCRYPT_LOG_ROUNDS,
+    # off so that a cheaper config never weakens existing hashes
+    BCRYPT_ALLOW_DOWNGRADE = False
+    # cache of GET listing and search responses: 'memory' for a per worker
+    # LRU, 'redis' to share it between workers, None to turn it off
+    RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'memory')
+    RESPONSE_CACHE_SIZE = 1024
+    RESPONSE_CACHE_TTL = 60
+    RESPONSE_CACHE_REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    # most recipes accepted by one bulk creation request
+    BULK_RECIPES_MAX = 500
+    # most ids accepted by one bulk update or delete request
+    BULK_IDS_MAX = 1000
+    # recipes saved per transaction when importing a cookbook
+    IMPORT_CHUNK_SIZE = 1000
+    # most recipes embedded per category with ?embed=recipes
+    EMBED_LIMIT_MAX = 50
+    # least pg_trgm similarity of a category name to a fuzzy search
+    CATEGORY_SIMILARITY_THRESHOLD = 0.3
+    # search in Postgres, or 'memory' for the in-process index of each user,
+    # warmed from SEARCH_INDEX_SNAPSHOT when that file exists
+    SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'postgres')
+    SEARCH_INDEX_USERS = 256
+    SEARCH_INDEX_SNAPSHOT = os.getenv('SEARCH_INDEX_SNAPSHOT')
+    # users whose ingredient bitmaps each worker keeps for pantry queries
+    PANTRY_INDEX_USERS = 64
 
 
 class DevelopmentConfig(Config):
@@ -26,6 +67,8 @@ class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL',
                                         'postgresql://postgres:@localhost:5432/test_db')
     DEBUG = True
+    BCRYPT_LOG_ROUNDS = 4
+    METRICS_TOKEN = 'metrics token'
 
 
 class StagingConfig(Config):
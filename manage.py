@@ -1,9 +1,14 @@
 """Handles DB migrations and upgrade in postgres"""
 import os
+import time
 import unittest
 from flask_script import Manager
 from flask_migrate import Migrate, MigrateCommand
 from app import db, make_app
+from app.helpers.hashing import bcrypt
+from app.helpers import cookbook_import
+from app.helpers.search_index import search_index
+from app.models import User, Recipes
 
 app = make_app(config_name=os.getenv('APP_SETTINGS'))
 migrate = Migrate(app, db)
@@ -22,5 +27,104 @@ def test():
     return 1
 
 
+@manager.command
+def calibrate_bcrypt(target_ms=250, lowest_cost=4, upper_cost=16):
+    """method to time bcrypt on this host and recommend a BCRYPT_LOG_ROUNDS value"""
+    target_ms, lowest_cost, upper_cost = float(target_ms), int(lowest_cost), int(upper_cost)
+    password = 'calibration P@ssword'
+    recommended = lowest_cost
+    print('cost  hash_ms  check_ms')
+    for cost in range(lowest_cost, upper_cost + 1):
+        started = time.time()
+        pw_hash = bcrypt.generate_password_hash(password, cost)
+        hash_ms = (time.time() - started) * 1000
+        started = time.time()
+        bcrypt.check_password_hash(pw_hash, password)
+        check_ms = (time.time() - started) * 1000
+        print('{:>4}  {:>7.1f}  {:>8.1f}'.format(cost, hash_ms, check_ms))
+        if max(hash_ms, check_ms) > target_ms:
+            break
+        recommended = cost
+    print('Recommended BCRYPT_LOG_ROUNDS for {:.0f}ms: {} (configured: {})'.format(
+        target_ms, recommended, app.config['BCRYPT_LOG_ROUNDS']))
+    return recommended
+
+
+@manager.command
+def reconcile_counters():
+    """method to recount the category and recipe counters and repair any drift"""
+    fixed = User.reconcile_counters()
+    print('Repaired counters of {users} users and {categories} categories'.format(**fixed))
+    return fixed
+
+
+@manager.command
+def import_cookbook(email, path, format='ndjson'):
+    """method to import categories and recipes for a user from an NDJSON or CSV export"""
+    user = User.query.filter_by(email=email).first()
+    if user is None:
+        print('No user with the email {}'.format(email))
+        return None
+    with open(path, 'rb') as lines:
+        report = cookbook_import.import_cookbook(lines, format, user.id,
+                                                 app.config['IMPORT_CHUNK_SIZE'])
+    print('Imported {categories} categories and {recipes} recipes, {failed} failed'.format(
+        **report))
+    for error in report['errors']:
+        print('line {line}: {message}'.format(**error))
+    return report
+
+
+@manager.command
+def snapshot_search_index(path):
+    """method to write the in-process search index of every user to a snapshot file"""
+    user_ids = [user_id for user_id, in db.session.query(User.id).order_by(User.id)]
+    written = search_index.snapshot(path, user_ids)
+    print('Wrote the search index of {} users to {}'.format(written, path))
+    return written
+
+
+@manager.command
+def benchmark_search(email, query, runs=20):
+    """method to time a recipe search of a user with ILIKE, full text search and the in-process index"""
+    runs = int(runs)
+    user = User.query.filter_by(email=email).first()
+    if user is None:
+        print('No user with the email {}'.format(email))
+        return None
+    pattern = '%' + query + '%'
+    ilike = Recipes.query.filter(Recipes.created_by == user.id, db.or_(
+        Recipes.recipe_name.ilike(pattern), Recipes.recipe_ingredients.ilike(pattern),
+        Recipes.recipe_methods.ilike(pattern))).with_entities(Recipes.id)
+    words = ' & '.join(word + ':*' for word in query.split())
+    full_text = Recipes.query.filter(
+        Recipes.created_by == user.id,
+        Recipes.search_vector.op('@@')(db.func.to_tsquery('english', words))).with_entities(
+            Recipes.id)
+
+    started = time.time()
+    user_index = search_index.build(user.id)
+    build_ms = (time.time() - started) * 1000
+
+    def best_ms(search):
+        best = None
+        for _ in range(runs):
+            started = time.time()
+            found = search()
+            elapsed = (time.time() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best, len(found)
+
+    timings = {'ilike': best_ms(ilike.all),
+               'full_text': best_ms(full_text.all),
+               'memory': best_ms(lambda: user_index.recipes.search(query))}
+    print('backend     best_ms  matches')
+    for backend, (elapsed, found) in timings.items():
+        print('{:<10}  {:>7.2f}  {:>7}'.format(backend, elapsed, found))
+    print('Built the in-process index of {} recipes in {:.0f}ms'.format(
+        len(user_index.recipes.lengths), build_ms))
+    return timings
+
+
 if __name__ == '__main__':
     manager.run()
\ No newline at end of file
@@ -0,0 +1,53 @@
+"""ingredients of recipes as rows, backfilled from the recipes' ingredients text
+
+Revision ID: 2c6f8e1b9d34
+Revises: b7e14d9a3c52
+Create Date: 2026-10-18 18:40:27.519306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c6f8e1b9d34'
+down_revision = 'b7e14d9a3c52'
+branch_labels = None
+depends_on = None
+
+# the ingredient names app.helpers.ingredients.parse_ingredients gives
+RECIPE_INGREDIENT_NAMES = (
+    "SELECT DISTINCT recipes.id AS recipe_id, "
+    "lower(btrim(regexp_replace(part, '\\s+', ' ', 'g'))) AS name "
+    "FROM recipes, regexp_split_to_table(recipes.recipe_ingredients, '[,;\\n]') AS part")
+
+
+def upgrade():
+    op.create_table('ingredients',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=256), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('recipe_ingredients',
+    sa.Column('recipe_id', sa.Integer(), nullable=False),
+    sa.Column('ingredient_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['ingredient_id'], ['ingredients.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('recipe_id', 'ingredient_id')
+    )
+    op.create_index('ix_recipe_ingredients_ingredient_id_recipe_id', 'recipe_ingredients',
+                    ['ingredient_id', 'recipe_id'])
+    op.execute('INSERT INTO ingredients (name) SELECT DISTINCT name FROM ({}) AS names '
+               'WHERE name <> \'\''.format(RECIPE_INGREDIENT_NAMES))
+    op.execute('INSERT INTO recipe_ingredients (recipe_id, ingredient_id) '
+               'SELECT names.recipe_id, ingredients.id FROM ({}) AS names '
+               'JOIN ingredients ON ingredients.name = names.name'.format(
+                   RECIPE_INGREDIENT_NAMES))
+
+
+def downgrade():
+    op.drop_index('ix_recipe_ingredients_ingredient_id_recipe_id',
+                  table_name='recipe_ingredients')
+    op.drop_table('recipe_ingredients')
+    op.drop_table('ingredients')
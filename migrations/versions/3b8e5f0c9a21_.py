@@ -0,0 +1,35 @@
+"""revoke tokens with a per-user token version instead of a blacklist
+
+Revision ID: 3b8e5f0c9a21
+Revises: 1654474a92cd
+Create Date: 2026-10-18 09:12:44.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8e5f0c9a21'
+down_revision = '1654474a92cd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('users', sa.Column('token_version', sa.Integer(),
+                                     server_default='0', nullable=False))
+    # tokens issued before this revision carry no version and are rejected,
+    # so the blacklisted tokens no longer need to be kept
+    op.drop_table('token_blacklist')
+
+
+def downgrade():
+    op.create_table('token_blacklist',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('auth_token', sa.String(length=256), nullable=False),
+    sa.Column('date_created', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('auth_token')
+    )
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,28 @@
+"""index category and recipe names for duplicate checks and imports
+
+Revision ID: 5d9c2e7a4f10
+Revises: e5b07c3f19d8
+Create Date: 2026-10-18 16:40:52.271904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d9c2e7a4f10'
+down_revision = 'e5b07c3f19d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_categories_created_by_category_name', 'categories',
+                    ['created_by', 'category_name'])
+    op.create_index('ix_recipes_category_id_recipe_name', 'recipes',
+                    ['category_id', 'recipe_name'])
+
+
+def downgrade():
+    op.drop_index('ix_recipes_category_id_recipe_name', table_name='recipes')
+    op.drop_index('ix_categories_created_by_category_name', table_name='categories')
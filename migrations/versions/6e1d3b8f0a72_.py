@@ -0,0 +1,24 @@
+"""index the recipes of each user for searches across categories
+
+Revision ID: 6e1d3b8f0a72
+Revises: 2c6f8e1b9d34
+Create Date: 2026-10-18 19:12:06.384120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e1d3b8f0a72'
+down_revision = '2c6f8e1b9d34'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_recipes_created_by_id', 'recipes', ['created_by', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_recipes_created_by_id', table_name='recipes')
@@ -0,0 +1,47 @@
+"""keep category and recipe counters on users and categories
+
+Revision ID: 7c2d4a61e0f3
+Revises: 3b8e5f0c9a21
+Create Date: 2026-10-18 11:40:02.571930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2d4a61e0f3'
+down_revision = '3b8e5f0c9a21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # recipes.created_by is declared on the model but no earlier revision
+    # created it, and the user recipe counters are counted from it
+    recipe_columns = [column['name'] for column in
+                      sa.inspect(op.get_bind()).get_columns('recipes')]
+    if 'created_by' not in recipe_columns:
+        op.add_column('recipes', sa.Column('created_by', sa.Integer(), nullable=True))
+        op.create_foreign_key(None, 'recipes', 'users', ['created_by'], ['id'])
+        op.execute('UPDATE recipes SET created_by = categories.created_by '
+                   'FROM categories WHERE categories.id = recipes.category_id')
+    op.add_column('users', sa.Column('category_count', sa.Integer(),
+                                     server_default='0', nullable=False))
+    op.add_column('users', sa.Column('recipe_count', sa.Integer(),
+                                     server_default='0', nullable=False))
+    op.add_column('categories', sa.Column('recipe_count', sa.Integer(),
+                                          server_default='0', nullable=False))
+    op.execute('UPDATE categories SET recipe_count = '
+               '(SELECT count(*) FROM recipes WHERE recipes.category_id = categories.id)')
+    op.execute('UPDATE users SET '
+               'category_count = (SELECT count(*) FROM categories '
+               'WHERE categories.created_by = users.id), '
+               'recipe_count = (SELECT count(*) FROM recipes '
+               'WHERE recipes.created_by = users.id)')
+
+
+def downgrade():
+    op.drop_column('categories', 'recipe_count')
+    op.drop_column('users', 'recipe_count')
+    op.drop_column('users', 'category_count')
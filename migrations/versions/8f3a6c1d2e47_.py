@@ -0,0 +1,32 @@
+"""full text search vector over recipe names, ingredients and methods
+
+Revision ID: 8f3a6c1d2e47
+Revises: 5d9c2e7a4f10
+Create Date: 2026-10-18 17:25:13.604418
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f3a6c1d2e47'
+down_revision = '5d9c2e7a4f10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # generated columns need PostgreSQL 12 or newer
+    op.execute(
+        "ALTER TABLE recipes ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', coalesce(recipe_name, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(recipe_ingredients, '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(recipe_methods, '')), 'C')) STORED")
+    op.create_index('ix_recipes_search_vector', 'recipes', ['search_vector'],
+                    postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_recipes_search_vector', table_name='recipes')
+    op.drop_column('recipes', 'search_vector')
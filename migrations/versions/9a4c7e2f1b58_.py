@@ -0,0 +1,24 @@
+"""index the recipes of each category by id for embedding their first recipes
+
+Revision ID: 9a4c7e2f1b58
+Revises: 6e1d3b8f0a72
+Create Date: 2026-10-18 19:58:41.207356
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4c7e2f1b58'
+down_revision = '6e1d3b8f0a72'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_recipes_category_id_id', 'recipes', ['category_id', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_recipes_category_id_id', table_name='recipes')
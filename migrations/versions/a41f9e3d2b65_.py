@@ -0,0 +1,25 @@
+"""version each user's categories and recipes for conditional GETs
+
+Revision ID: a41f9e3d2b65
+Revises: 7c2d4a61e0f3
+Create Date: 2026-10-18 14:05:37.904112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41f9e3d2b65'
+down_revision = '7c2d4a61e0f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('users', sa.Column('collection_version', sa.Integer(),
+                                     server_default='0', nullable=False))
+
+
+def downgrade():
+    op.drop_column('users', 'collection_version')
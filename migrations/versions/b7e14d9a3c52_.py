@@ -0,0 +1,27 @@
+"""trigram index of category names for fuzzy search
+
+Revision ID: b7e14d9a3c52
+Revises: 8f3a6c1d2e47
+Create Date: 2026-10-18 18:02:44.137205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e14d9a3c52'
+down_revision = '8f3a6c1d2e47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_categories_category_name_trgm', 'categories', ['category_name'],
+                    postgresql_using='gin',
+                    postgresql_ops={'category_name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.drop_index('ix_categories_category_name_trgm', table_name='categories')
@@ -0,0 +1,28 @@
+"""version categories and recipes for optimistic concurrency on edits
+
+Revision ID: e5b07c3f19d8
+Revises: a41f9e3d2b65
+Create Date: 2026-10-18 15:12:09.418530
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b07c3f19d8'
+down_revision = 'a41f9e3d2b65'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('categories', sa.Column('version', sa.Integer(),
+                                          server_default='1', nullable=False))
+    op.add_column('recipes', sa.Column('version', sa.Integer(),
+                                       server_default='1', nullable=False))
+
+
+def downgrade():
+    op.drop_column('recipes', 'version')
+    op.drop_column('categories', 'version')
@@ -1,7 +1,13 @@
 """Tests for User Authentication"""
 import unittest
 import json
+import threading
+import time
 from app import db, make_app
+from app.models import User
+from app.helpers.token_cache import verified_tokens
+from app.helpers.hashing import hashing_pool
+from config import app_config
 
 base_url = '/yummy_api/v1/auth'
 
@@ -182,6 +188,185 @@ class TestAuth(unittest.TestCase):
                                          headers=dict(Authorization=self.access_token))
         self.assertEqual(user_logout.status_code, 200)
 
+    def test_token_rejected_after_logout(self):
+        """Method to check that a cached token stops working once logged out
+        """
+        user_register = self.client().post(base_url + '/register', data=self.user_details)
+        self.assertEqual(user_register.status_code, 201)
+
+        user_login = self.client().post(base_url + '/login', data=self.user_details)
+        self.access_token = json.loads(user_login.data.decode())[
+            'access_token']
+
+        get_categories = self.client().get('/yummy_api/v1/categories/',
+                                           headers=dict(Authorization=self.access_token))
+        self.assertEqual(get_categories.status_code, 404)
+
+        user_logout = self.client().post(base_url + '/logout',
+                                         headers=dict(Authorization=self.access_token))
+        self.assertEqual(user_logout.status_code, 200)
+
+        get_categories = self.client().get('/yummy_api/v1/categories/',
+                                           headers=dict(Authorization=self.access_token))
+        self.assertEqual(get_categories.status_code, 401)
+
+    def test_password_reset_revokes_issued_tokens(self):
+        """Method to check that a password reset logs out every issued token
+        """
+        user_register = self.client().post(base_url + '/register', data=self.user_details)
+        self.assertEqual(user_register.status_code, 201)
+
+        user_login = self.client().post(base_url + '/login', data=self.user_details)
+        self.access_token = json.loads(user_login.data.decode())[
+            'access_token']
+
+        password_reset = self.client().put(
+            base_url + '/password-reset',
+            data={'email': 'someone@gmail.com',
+                  'reset_password': 'new_password', 'secret_word': 'TOP SECRET'})
+        self.assertEqual(password_reset.status_code, 200)
+
+        get_categories = self.client().get('/yummy_api/v1/categories/',
+                                           headers=dict(Authorization=self.access_token))
+        self.assertEqual(get_categories.status_code, 401)
+
+    def test_login_after_logout_issues_a_working_token(self):
+        """Method to check that a new login is accepted after a logout
+        """
+        user_register = self.client().post(base_url + '/register', data=self.user_details)
+        self.assertEqual(user_register.status_code, 201)
+
+        user_login = self.client().post(base_url + '/login', data=self.user_details)
+        self.access_token = json.loads(user_login.data.decode())[
+            'access_token']
+        user_logout = self.client().post(base_url + '/logout',
+                                         headers=dict(Authorization=self.access_token))
+        self.assertEqual(user_logout.status_code, 200)
+
+        user_login = self.client().post(base_url + '/login', data=self.user_details)
+        self.access_token = json.loads(user_login.data.decode())[
+            'access_token']
+        get_categories = self.client().get('/yummy_api/v1/categories/',
+                                           headers=dict(Authorization=self.access_token))
+        self.assertEqual(get_categories.status_code, 404)
+
+    def test_token_cache_hit_rate_on_metrics(self):
+        """Method to check that repeated calls with one token hit the token
+        cache, as reported to the holder of the metrics token
+        """
+        user_register = self.client().post(base_url + '/register', data=self.user_details)
+        self.assertEqual(user_register.status_code, 201)
+
+        user_login = self.client().post(base_url + '/login', data=self.user_details)
+        self.access_token = json.loads(user_login.data.decode())[
+            'access_token']
+
+        for _ in range(3):
+            self.client().get('/yummy_api/v1/categories/',
+                              headers=dict(Authorization=self.access_token))
+        metrics = self.client().get('/yummy_api/v1/metrics')
+        self.assertEqual(metrics.status_code, 401)
+        metrics = self.client().get('/yummy_api/v1/metrics', headers=dict(
+            Authorization=self.app.config['METRICS_TOKEN']))
+        self.assertEqual(metrics.status_code, 200)
+        token_cache = json.loads(metrics.data.decode())['token_cache']
+        self.assertEqual(token_cache['hits'], 2)
+        self.assertEqual(token_cache['misses'], 1)
+
+        self.app.config['METRICS_TOKEN'] = None
+        metrics = self.client().get('/yummy_api/v1/metrics', headers=dict(Authorization=''))
+        self.assertEqual(metrics.status_code, 404)
+
+    def test_expired_tokens_are_purged_from_token_cache(self):
+        """Method to check that expired tokens do not linger in the token cache
+        """
+        for user_id in range(10):
+            verified_tokens.set('expired-token-{}'.format(user_id), user_id, time.time() - 1)
+        verified_tokens.set('live-token', 1, time.time() + 60)
+        self.assertEqual(verified_tokens.stats()['size'], 1)
+        self.assertEqual(verified_tokens.stats()['purged'], 10)
+        self.assertEqual(verified_tokens.get('live-token'), 1)
+
+    def test_register_fails_fast_when_hashing_pool_is_full(self):
+        """Method to check that registration is refused with 503 while the hashing pool is full
+        """
+        hashing_pool.configure(1, 0)
+        release = threading.Event()
+        busy_worker = threading.Thread(target=hashing_pool.run, args=(release.wait,))
+        busy_worker.start()
+        try:
+            while not hashing_pool.stats()['in_flight']:
+                time.sleep(0.01)
+            user_register = self.client().post(base_url + '/register', data=self.user_details)
+            self.assertEqual(user_register.status_code, 503)
+            self.assertEqual(user_register.headers['Retry-After'], '1')
+            self.assertEqual(hashing_pool.stats()['rejected'], 1)
+        finally:
+            release.set()
+            busy_worker.join()
+
+        user_register = self.client().post(base_url + '/register', data=self.user_details)
+        self.assertEqual(user_register.status_code, 201)
+
+    def test_hashing_pool_reconfigured_with_a_job_in_flight(self):
+        """Method to check that a job admitted before the pool is reconfigured
+        finishes on its own executor and frees its own slot
+        """
+        hashing_pool.configure(1, 0)
+        release = threading.Event()
+        results = []
+        busy_worker = threading.Thread(
+            target=lambda: results.append(hashing_pool.run(lambda: release.wait() and 'done')))
+        busy_worker.start()
+        while not hashing_pool.stats()['in_flight']:
+            time.sleep(0.01)
+        hashing_pool.configure(2, 4)
+        release.set()
+        busy_worker.join()
+        self.assertEqual(results, ['done'])
+        self.assertEqual(hashing_pool.stats()['in_flight'], 0)
+        self.assertEqual(hashing_pool.run(len, 'abc'), 3)
+
+    def test_login_rehashes_password_with_the_configured_cost(self):
+        """Method to check that login moves a stored password to the configured bcrypt cost
+        """
+        user_register = self.client().post(base_url + '/register', data=self.user_details)
+        self.assertEqual(user_register.status_code, 201)
+
+        self.app.config['BCRYPT_LOG_ROUNDS'] = 5
+        user_login = self.client().post(base_url + '/login', data=self.user_details)
+        self.assertEqual(user_login.status_code, 200)
+        with self.app.app_context():
+            user = User.query.filter_by(email='someone@gmail.com').first()
+            self.assertTrue(user.password.startswith('$2b$05$'))
+
+        user_login = self.client().post(base_url + '/login', data=self.user_details)
+        self.assertEqual(user_login.status_code, 200)
+
+    def test_login_never_rehashes_password_to_a_lower_cost(self):
+        """Method to check that the production config keeps its cost and that
+        a cheaper config leaves stronger stored hashes alone unless allowed to
+        """
+        self.assertEqual(app_config['production'].BCRYPT_LOG_ROUNDS, 12)
+        self.assertFalse(app_config['production'].BCRYPT_ALLOW_DOWNGRADE)
+
+        self.app.config['BCRYPT_LOG_ROUNDS'] = 5
+        user_register = self.client().post(base_url + '/register', data=self.user_details)
+        self.assertEqual(user_register.status_code, 201)
+
+        self.app.config['BCRYPT_LOG_ROUNDS'] = 4
+        user_login = self.client().post(base_url + '/login', data=self.user_details)
+        self.assertEqual(user_login.status_code, 200)
+        with self.app.app_context():
+            user = User.query.filter_by(email='someone@gmail.com').first()
+            self.assertTrue(user.password.startswith('$2b$05$'))
+
+        self.app.config['BCRYPT_ALLOW_DOWNGRADE'] = True
+        self.client().post(base_url + '/login', data=self.user_details)
+        with self.app.app_context():
+            user = User.query.filter_by(email='someone@gmail.com').first()
+            self.assertTrue(user.password.startswith('$2b$04$'))
+
     def test_error_exception_on_password_reset(self):
         """Method to check for a handled error exception on password reset
         """
@@ -3,11 +3,28 @@
 
 import unittest
 import json
+from sqlalchemy import event
 from app import make_app, db
+from app.models import User
+from app.helpers.response_cache import response_cache, RedisBackend
 
 base_url = '/yummy_api/v1/'
 
 
+class LocalRedis(object):
+    """Stand-in for a redis client with the few commands the response cache uses
+    """
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value.encode()
+
+
 class CategoriesTestCase(unittest.TestCase):
     """Represents the test case for Categories
     """
@@ -111,6 +128,116 @@ class CategoriesTestCase(unittest.TestCase):
             Authorization=self.access_token))
         self.assertEqual(get_categories.status_code, 200)
 
+    def test_to_check_for_cursor_paginated_recipe_categories(self):
+        """Method to test paging through categories with cursors
+        """
+        for category_name in ['Breakfast', 'Lunch', 'Dinner']:
+            create_categories = self.client().post(base_url + 'categories/', headers=dict(
+                Authorization=self.access_token), data={'category_name': category_name})
+            self.assertEqual(create_categories.status_code, 201)
+
+        get_categories = self.client().get(base_url + 'categories/?after=&limit=2', headers=dict(
+            Authorization=self.access_token))
+        self.assertEqual(get_categories.status_code, 200)
+        categories_data = json.loads(get_categories.data.decode())
+        self.assertEqual([category['category_name'] for category in categories_data],
+                         ['Breakfast', 'Lunch'])
+        next_cursor = categories_data[0]['next_cursor']
+
+        get_categories = self.client().get(
+            base_url + 'categories/?after={}&limit=2'.format(next_cursor), headers=dict(
+                Authorization=self.access_token))
+        categories_data = json.loads(get_categories.data.decode())
+        self.assertEqual([category['category_name'] for category in categories_data], ['Dinner'])
+        self.assertIsNone(categories_data[0]['next_cursor'])
+
+    def test_invalid_category_cursor(self):
+        """Method to test the response to a cursor that was not issued by the API
+        """
+        get_categories = self.client().get(base_url + 'categories/?after=@@@', headers=dict(
+            Authorization=self.access_token))
+        self.assertEqual(get_categories.status_code, 400)
+
+    def test_category_counter_follows_creation_and_deletion(self):
+        """Method to test that page numbers come from the maintained category counter
+        """
+        for category_name in ['Breakfast', 'Lunch', 'Dinner']:
+            self.client().post(base_url + 'categories/', headers=dict(
+                Authorization=self.access_token), data={'category_name': category_name})
+        delete_result = self.client().delete(base_url + 'categories/3',
+                                             headers=dict(Authorization=self.access_token))
+        self.assertEqual(delete_result.status_code, 200)
+
+        with self.app.app_context():
+            self.assertEqual(User.query.get(1).category_count, 2)
+        get_categories = self.client().get(base_url + 'categories/?page=1&limit=1', headers=dict(
+            Authorization=self.access_token))
+        categories_data = json.loads(get_categories.data.decode())
+        self.assertEqual(categories_data[0]['next_Page'], 2)
+        get_categories = self.client().get(base_url + 'categories/?page=2&limit=1', headers=dict(
+            Authorization=self.access_token))
+        categories_data = json.loads(get_categories.data.decode())
+        self.assertIsNone(categories_data[0]['next_Page'])
+
+    def test_reconcile_repairs_drifted_counters(self):
+        """Method to test that reconciling counters repairs a counter that drifted
+        """
+        self.client().post(base_url + 'categories/', headers=dict(
+            Authorization=self.access_token), data=self.categories)
+        with self.app.app_context():
+            User.query.filter_by(id=1).update({'category_count': 7})
+            db.session.commit()
+            self.assertEqual(User.reconcile_counters(), {'users': 1, 'categories': 0})
+            self.assertEqual(User.query.get(1).category_count, 1)
+
+    def test_v2_category_listing_returns_a_page_envelope(self):
+        """Method to test the v2 listing, with page details given once
+        """
+        for category_name in ['Breakfast', 'Lunch']:
+            self.client().post(base_url + 'categories/', headers=dict(
+                Authorization=self.access_token), data={'category_name': category_name})
+        get_categories = self.client().get('/yummy_api/v2/categories/?page=1&limit=1',
+                                           headers=dict(Authorization=self.access_token))
+        self.assertEqual(get_categories.status_code, 200)
+        categories_data = json.loads(get_categories.data.decode())
+        self.assertEqual(categories_data['page'], {'previous_page': None, 'next_page': 2})
+        self.assertEqual(len(categories_data['items']), 1)
+        self.assertNotIn('next_Page', categories_data['items'][0])
+
+    def test_v2_category_search_selected_by_accept_header(self):
+        """Method to test that the v1 search serves the v2 envelope when asked to
+        """
+        self.client().post(base_url + 'categories/', headers=dict(
+            Authorization=self.access_token), data=self.categories)
+        search_categories = self.client().get(
+            base_url + 'categories/search/?q=New&after=', headers={
+                'Authorization': self.access_token,
+                'Accept': 'application/vnd.yummy.v2+json'})
+        self.assertEqual(search_categories.status_code, 200)
+        categories_data = json.loads(search_categories.data.decode())
+        self.assertEqual(categories_data['page'], {'next_cursor': None})
+        self.assertEqual(categories_data['items'][0]['category_name'], 'New_Category')
+
+    def test_negotiated_responses_vary_on_accept(self):
+        """Method to test that every v1 listing and search response, cached,
+        not modified or refused, tells shared caches that it depends on Accept
+        """
+        self.client().post(base_url + 'categories/', headers=dict(
+            Authorization=self.access_token), data=self.categories)
+        first = self.client().get(base_url + 'categories/', headers=dict(
+            Authorization=self.access_token))
+        cached = self.client().get(base_url + 'categories/', headers=dict(
+            Authorization=self.access_token))
+        not_modified = self.client().get(base_url + 'categories/', headers={
+            'Authorization': self.access_token, 'If-None-Match': first.headers['ETag']})
+        refused = self.client().get(base_url + 'categories/search/?q=New&mode=exact', headers=dict(
+            Authorization=self.access_token))
+        self.assertEqual([response.status_code for response in
+                          (first, cached, not_modified, refused)], [200, 200, 304, 400])
+        for response in (first, cached, not_modified, refused):
+            self.assertIn('Accept', response.headers.get('Vary', ''))
+        self.assertEqual(response_cache.stats()['hits'], 2)
+
     def test_to_check_response_from_url_parameters(self):
         """Method to check returned response of an empty category
         """
@@ -118,6 +245,273 @@ class CategoriesTestCase(unittest.TestCase):
             Authorization=self.access_token))
         self.assertEqual(get_categories.status_code, 404)
 
+    def test_category_listing_does_not_load_the_user_row(self):
+        """Method to check that listing categories only needs the user id from the token
+        """
+        self.client().post(base_url + 'categories/', headers=dict(
+            Authorization=self.access_token), data=self.categories)
+        statements = []
+
+        def record_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', record_statement)
+            try:
+                get_categories = self.client().get(base_url + 'categories/', headers=dict(
+                    Authorization=self.access_token))
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', record_statement)
+        self.assertEqual(get_categories.status_code, 200)
+        self.assertFalse([statement for statement in statements if 'users.password' in statement])
+
+    def test_category_listing_is_served_from_the_response_cache(self):
+        """Method to check that a repeated listing is served with only the
+        user's collection version read from the db until the user writes a category
+        """
+        self.client().post(base_url + 'categories/', headers=dict(
+            Authorization=self.access_token), data=self.categories)
+        first = self.client().get(base_url + 'categories/', headers=dict(
+            Authorization=self.access_token))
+        statements = []
+
+        def record_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', record_statement)
+            try:
+                second = self.client().get(base_url + 'categories/', headers=dict(
+                    Authorization=self.access_token))
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', record_statement)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second.headers['ETag'], first.headers['ETag'])
+        self.assertEqual(len(statements), 1)
+        self.assertIn('users.collection_version', statements[0])
+
+        self.client().post(base_url + 'categories/', headers=dict(
+            Authorization=self.access_token), data={'category_name': 'Lunch'})
+        third = self.client().get(base_url + 'categories/', headers=dict(
+            Authorization=self.access_token))
+        self.assertEqual(len(json.loads(third.data.decode())), 2)
+
+        metrics = json.loads(self.client().get('/yummy_api/v1/metrics', headers=dict(
+            Authorization=self.app.config['METRICS_TOKEN'])).data.decode())
+        self.assertEqual(metrics['response_cache']['hits'], 1)
+        self.assertEqual(metrics['response_cache']['misses'], 2)
+
+    def test_response_cached_while_another_write_lands_is_not_served(self):
+        """Method to check that a listing read while another request writes is
+        cached under the version it was read in, not the one after the write
+        """
+        self.client().post(base_url + 'categories/', headers=dict(
+            Authorization=self.access_token), data=self.categories)
+        written = []
+
+        def write_meanwhile(conn, cursor, statement, *args):
+            if not written and 'FROM categories' in statement:
+                written.append(statement)
+                db.engine.execute(User.__table__.update().values(
+                    collection_version=User.collection_version + 1))
+
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', write_meanwhile)
+            try:
+                self.client().get(base_url + 'categories/', headers=dict(
+                    Authorization=self.access_token))
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', write_meanwhile)
+        self.client().get(base_url + 'categories/', headers=dict(
+            Authorization=self.access_token))
+        self.assertEqual(response_cache.stats()['hits'], 0)
+        self.assertEqual(response_cache.stats()['misses'], 2)
+
+    def test_write_on_another_worker_is_seen_by_the_response_cache(self):
+        """Method to check that a write no hook of this worker saw, as on
+        another worker, still turns the next read into a miss
+        """
+        self.client().post(base_url + 'categories/', headers=dict(
+            Authorization=self.access_token), data=self.categories)
+        first = self.client().get(base_url + 'categories/', headers=dict(
+            Authorization=self.access_token))
+        with self.app.app_context():
+            db.session.execute(User.__table__.update().values(
+                collection_version=User.collection_version + 1))
+            db.session.commit()
+        second = self.client().get(base_url + 'categories/', headers={
+            'Authorization': self.access_token, 'If-None-Match': first.headers['ETag']})
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second.headers['ETag'], first.headers['ETag'])
+        self.assertEqual(response_cache.stats()['hits'], 0)
+
+    def test_category_search_with_the_redis_response_cache(self):
+        """Method to check the redis backend against a local stand-in
+        """
+        response_cache.configure(RedisBackend(LocalRedis()), 60)
+        self.client().post(base_url + 'categories/', headers=dict(
+            Authorization=self.access_token), data=self.categories)
+        first = self.client().get(base_url + 'categories/search/?q=new', headers=dict(
+            Authorization=self.access_token))
+        second = self.client().get(base_url + 'categories/search/?q=new', headers={
+            'Authorization': self.access_token, 'If-None-Match': first.headers['ETag']})
+        self.assertEqual(second.status_code, 304)
+
+        self.client().put(base_url + 'categories/1', headers=dict(
+            Authorization=self.access_token), data={'category_name': 'New_Lunch'})
+        third = self.client().get(base_url + 'categories/search/?q=new', headers=dict(
+            Authorization=self.access_token))
+        self.assertIn('New_Lunch', str(third.data))
+        self.assertEqual(response_cache.stats()['hits'], 1)
+
+    def test_api_deletes_categories_in_bulk(self):
+        """test to check that categories picked by id are deleted with one DELETE
+        and only among the user's own categories
+        """
+        for category_name in ('Breakfast', 'Lunch', 'Supper'):
+            self.client().post(base_url + 'categories/', headers=dict(
+                Authorization=self.access_token), data={'category_name': category_name})
+        self.client().post(base_url + 'categories/1/recipes/', headers=dict(
+            Authorization=self.access_token), data={'recipe_name': 'Tea',
+                                                    'recipe_ingredients': 'Water',
+                                                    'recipe_methods': 'Boil'})
+        statements = []
+
+        def record_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', record_statement)
+            try:
+                result = self.client().delete(base_url + 'categories/bulk', headers=dict(
+                    Authorization=self.access_token), data=json.dumps({'ids': [1, 2, 99]}),
+                                              content_type='application/json')
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', record_statement)
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(json.loads(result.data.decode())['ids'], [1, 2])
+        self.assertFalse([statement for statement in statements
+                          if statement.startswith('SELECT categories')])
+        with self.app.app_context():
+            self.assertEqual(User.query.get(1).category_count, 1)
+            self.assertEqual(User.query.get(1).recipe_count, 0)
+
+        result = self.client().delete(base_url + 'categories/bulk', headers=dict(
+            Authorization=self.access_token), data=json.dumps({'q': 'supp'}),
+                                      content_type='application/json')
+        self.assertEqual(json.loads(result.data.decode())['ids'], [3])
+
+    def test_api_bulk_deletes_only_literal_matches_of_wildcards(self):
+        """test to check that LIKE wildcards in the search term of a bulk delete
+        only match themselves
+        """
+        for category_name in ('Breakfast', 'Lunch', 'Supper'):
+            self.client().post(base_url + 'categories/', headers=dict(
+                Authorization=self.access_token), data={'category_name': category_name})
+        for search in ('%', '_', '\\'):
+            result = self.client().delete(base_url + 'categories/bulk', headers=dict(
+                Authorization=self.access_token), data=json.dumps({'q': search}),
+                                          content_type='application/json')
+            self.assertEqual(result.status_code, 200)
+            self.assertEqual(json.loads(result.data.decode())['ids'], [])
+        with self.app.app_context():
+            self.assertEqual(User.query.get(1).category_count, 3)
+
+    def test_api_refuses_bulk_delete_without_a_selection(self):
+        """test to check that a bulk delete needs either ids or a search term
+        """
+        result = self.client().delete(base_url + 'categories/bulk', headers=dict(
+            Authorization=self.access_token), data=json.dumps({'q': ' '}),
+                                      content_type='application/json')
+        self.assertEqual(result.status_code, 400)
+
+    def test_api_embeds_recipes_in_the_category_listing(self):
+        """test to check that the recipes of a page of categories are embedded
+        with one query and limited per category
+        """
+        for category_name in ('Breakfast', 'Lunch', 'Supper'):
+            self.client().post(base_url + 'categories/', headers=dict(
+                Authorization=self.access_token), data={'category_name': category_name})
+        self.client().post(base_url + 'categories/1/recipes/', headers=dict(
+            Authorization=self.access_token), content_type='application/json',
+                           data=json.dumps([{'recipe_name': name, 'recipe_ingredients': 'Water',
+                                             'recipe_methods': 'Boil'}
+                                            for name in ('Tea', 'Coffee', 'Cocoa')]))
+        self.client().post(base_url + 'categories/2/recipes/', headers=dict(
+            Authorization=self.access_token), data={'recipe_name': 'Soup',
+                                                    'recipe_ingredients': 'Water',
+                                                    'recipe_methods': 'Boil'})
+        statements = []
+
+        def record_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', record_statement)
+            try:
+                result = self.client().get(
+                    base_url + 'categories/?embed=recipes&embed_limit=2',
+                    headers=dict(Authorization=self.access_token))
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', record_statement)
+        self.assertEqual(result.status_code, 200)
+        categories = json.loads(result.data.decode())
+        self.assertEqual([[recipe['recipe_name'] for recipe in category['recipes']]
+                          for category in categories], [['Tea', 'Coffee'], ['Soup'], []])
+        self.assertIsNone(categories[1]['recipes_next_cursor'])
+        self.assertEqual(len([statement for statement in statements
+                              if 'FROM recipes' in statement]), 1)
+
+        result = self.client().get(
+            base_url + 'categories/1/recipes/?after=' + categories[0]['recipes_next_cursor'],
+            headers=dict(Authorization=self.access_token))
+        self.assertEqual([recipe['recipe_name'] for recipe in json.loads(result.data.decode())],
+                         ['Cocoa'])
+
+    def test_api_embeds_recipes_in_a_category(self):
+        """test to check embedding recipes in a single category and that
+        unknown embeds are refused
+        """
+        self.client().post(base_url + 'categories/', headers=dict(
+            Authorization=self.access_token), data=self.categories)
+        self.client().post(base_url + 'categories/1/recipes/', headers=dict(
+            Authorization=self.access_token), data={'recipe_name': 'Tea',
+                                                    'recipe_ingredients': 'Water',
+                                                    'recipe_methods': 'Boil'})
+        result = self.client().get(base_url + 'categories/1?embed=recipes',
+                                   headers=dict(Authorization=self.access_token))
+        category = json.loads(result.data.decode())
+        self.assertEqual([recipe['recipe_name'] for recipe in category['recipes']], ['Tea'])
+
+        result = self.client().get(base_url + 'categories/1?embed=owner',
+                                   headers=dict(Authorization=self.access_token))
+        self.assertEqual(result.status_code, 400)
+
+    def test_api_finds_categories_with_typos_in_fuzzy_mode(self):
+        """test to check that fuzzy search finds similar names, closest first
+        """
+        with self.app.app_context():
+            if not db.session.execute("SELECT 1 FROM pg_available_extensions "
+                                      "WHERE name = 'pg_trgm'").first():
+                self.skipTest('pg_trgm is not available on this server')
+            db.session.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            db.session.commit()
+        for category_name in ('Breakfast', 'Breakfast Drinks', 'Supper'):
+            self.client().post(base_url + 'categories/', headers=dict(
+                Authorization=self.access_token), data={'category_name': category_name})
+        result = self.client().get(base_url + 'categories/search/?q=brekfast&mode=fuzzy',
+                                   headers=dict(Authorization=self.access_token))
+        self.assertEqual([category['category_name'] for category in
+                          json.loads(result.data.decode())], ['Breakfast', 'Breakfast Drinks'])
+
+    def test_api_refuses_an_unknown_search_mode(self):
+        """test to check that only the contains and fuzzy search modes are accepted
+        """
+        result = self.client().get(base_url + 'categories/search/?q=lunch&mode=regex',
+                                   headers=dict(Authorization=self.access_token))
+        self.assertEqual(result.status_code, 400)
+
     def test_api_can_get_category_by_id(self):
         """test to check if one can get the recipe category
         using provided ID
@@ -134,6 +528,94 @@ class CategoriesTestCase(unittest.TestCase):
         #test to check if the returned category is the one in the first index
         self.assertIn('New_Category', category_data['category_name'])
 
+    def test_api_can_get_category_with_selected_fields(self):
+        """test to check that a category can be fetched with only some of its fields
+        """
+        self.client().post(base_url + 'categories/',
+                           headers=dict(Authorization=self.access_token), data=self.categories)
+        result = self.client().get(base_url + 'categories/1?fields=category_name',
+                                   headers=dict(Authorization=self.access_token))
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(json.loads(result.data.decode()), {'category_name': 'New_Category'})
+
+    def test_api_answers_conditional_get_of_a_category(self):
+        """test to check that an unchanged category is answered with 304 Not Modified
+        """
+        self.client().post(base_url + 'categories/',
+                           headers=dict(Authorization=self.access_token), data=self.categories)
+        result = self.client().get(base_url + 'categories/1',
+                                   headers=dict(Authorization=self.access_token))
+        etag = result.headers['ETag']
+
+        result = self.client().get(base_url + 'categories/1', headers={
+            'Authorization': self.access_token, 'If-None-Match': etag})
+        self.assertEqual(result.status_code, 304)
+        self.assertEqual(result.data, b'')
+
+        self.client().put(base_url + 'categories/1', headers=dict(
+            Authorization=self.access_token), data={"category_name": "Newly_Edited"})
+        result = self.client().get(base_url + 'categories/1', headers={
+            'Authorization': self.access_token, 'If-None-Match': etag})
+        self.assertEqual(result.status_code, 200)
+        self.assertNotEqual(result.headers['ETag'], etag)
+
+    def test_api_refuses_to_edit_a_category_with_a_stale_etag(self):
+        """test to check that an edit carrying an outdated If-Match is refused with 412
+        """
+        self.client().post(base_url + 'categories/',
+                           headers=dict(Authorization=self.access_token), data=self.categories)
+        result = self.client().get(base_url + 'categories/1',
+                                   headers=dict(Authorization=self.access_token))
+        etag = result.headers['ETag']
+
+        result = self.client().put(base_url + 'categories/1', headers={
+            'Authorization': self.access_token, 'If-Match': etag},
+                                   data={"category_name": "Newly_Edited"})
+        self.assertEqual(result.status_code, 200)
+        self.assertNotEqual(result.headers['ETag'], etag)
+
+        result = self.client().put(base_url + 'categories/1', headers={
+            'Authorization': self.access_token, 'If-Match': etag},
+                                   data={"category_name": "Edited_Again"})
+        self.assertEqual(result.status_code, 412)
+        result = self.client().get(base_url + 'categories/1',
+                                   headers=dict(Authorization=self.access_token))
+        self.assertIn('Newly_Edited', str(result.data))
+
+    def test_api_edits_a_category_with_the_etag_of_a_partial_get(self):
+        """test to check that the ETag of a ?fields= or ?embed=recipes GET is
+        accepted as If-Match while the category is unchanged
+        """
+        self.client().post(base_url + 'categories/',
+                           headers=dict(Authorization=self.access_token), data=self.categories)
+        for query, name in (('?fields=id,category_name', 'Fields_Edit'),
+                            ('?embed=recipes', 'Embed_Edit')):
+            result = self.client().get(base_url + 'categories/1' + query,
+                                       headers=dict(Authorization=self.access_token))
+            result = self.client().put(base_url + 'categories/1', headers={
+                'Authorization': self.access_token, 'If-Match': result.headers['ETag']},
+                                       data={"category_name": name})
+            self.assertEqual(result.status_code, 200)
+
+    def test_api_answers_conditional_get_of_the_category_listing(self):
+        """test to check that the listing ETag changes once a category is added
+        """
+        self.client().post(base_url + 'categories/',
+                           headers=dict(Authorization=self.access_token), data=self.categories)
+        result = self.client().get(base_url + 'categories/',
+                                   headers=dict(Authorization=self.access_token))
+        etag = result.headers['ETag']
+        result = self.client().get(base_url + 'categories/', headers={
+            'Authorization': self.access_token, 'If-None-Match': etag})
+        self.assertEqual(result.status_code, 304)
+
+        self.client().post(base_url + 'categories/', headers=dict(
+            Authorization=self.access_token), data={'category_name': 'Lunch'})
+        result = self.client().get(base_url + 'categories/', headers={
+            'Authorization': self.access_token, 'If-None-Match': etag})
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(len(json.loads(result.data.decode())), 2)
+
     def test_api_failure_to_get_a_category(self):
         """test to check error failure if category not found
         """
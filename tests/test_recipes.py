@@ -1,8 +1,15 @@
 """Base Class to test recipe.py class
 """
+import io
 import json
+import os
+import tempfile
 import unittest
+from sqlalchemy import event
 from app import make_app, db
+from app.models import User, Categories
+from app.helpers.search_index import search_index
+from app.helpers.pantry_index import pantry_index
 
 base_url = 'yummy_api/v1'
 
@@ -352,6 +359,289 @@ class RecipesTestCase(unittest.TestCase):
                                              headers=dict(Authorization=self.access_token))
         self.assertEqual(delete_result.status_code, 404)
 
+    def test_recipe_counters_follow_creation_and_deletion(self):
+        """Method to test the recipe counters of the category and the user
+        """
+        self.client().post(base_url + '/categories/1/recipes/',
+                           headers=dict(Authorization=self.access_token), data=self.recipes)
+        self.client().post(base_url + '/categories/1/recipes/',
+                           headers=dict(Authorization=self.access_token), data=self.other_recipes)
+        delete_result = self.client().delete(base_url + '/categories/1/recipes/1',
+                                             headers=dict(Authorization=self.access_token))
+        self.assertEqual(delete_result.status_code, 200)
+
+        with self.app.app_context():
+            self.assertEqual(Categories.query.get(1).recipe_count, 1)
+            self.assertEqual(User.query.get(1).recipe_count, 1)
+
+        delete_result = self.client().delete(base_url + '/categories/1',
+                                             headers=dict(Authorization=self.access_token))
+        self.assertEqual(delete_result.status_code, 200)
+        with self.app.app_context():
+            self.assertEqual(User.query.get(1).recipe_count, 0)
+            self.assertEqual(User.query.get(1).category_count, 0)
+
+    def test_to_create_recipes_in_bulk(self):
+        """Method to check that a list of recipes is created with one insert and
+        reported item by item
+        """
+        self.client().post(base_url + '/categories/1/recipes/',
+                           headers=dict(Authorization=self.access_token), data=self.recipes)
+        recipes = [self.other_recipes, self.recipes,
+                   {'recipe_name': '', 'recipe_ingredients': 'milk', 'recipe_methods': 'boil'},
+                   {'recipe_name': 'Tea', 'recipe_ingredients': 'Water', 'recipe_methods': 'Boil'}]
+        statements = []
+
+        def record_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', record_statement)
+            try:
+                create_recipes = self.client().post(
+                    base_url + '/categories/1/recipes/', data=json.dumps(recipes),
+                    headers=dict(Authorization=self.access_token),
+                    content_type='application/json')
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', record_statement)
+        self.assertEqual(create_recipes.status_code, 201)
+        result = json.loads(create_recipes.data.decode())
+        self.assertEqual((result['created'], result['failed']), (2, 2))
+        self.assertEqual([item['status'] for item in result['results']],
+                         ['success', 'fail', 'fail', 'success'])
+        self.assertEqual(result['results'][1]['message'], 'Recipe name exists')
+        self.assertEqual(len([statement for statement in statements
+                              if statement.startswith('INSERT INTO recipes')]), 1)
+        with self.app.app_context():
+            self.assertEqual(Categories.query.get(1).recipe_count, 3)
+            self.assertEqual(User.query.get(1).recipe_count, 3)
+
+    def test_to_create_recipes_in_bulk_with_a_value_too_long(self):
+        """Method to check that an over-long value fails only its own item
+        """
+        recipes = [self.recipes, dict(self.other_recipes, recipe_methods='stir ' * 60)]
+        create_recipes = self.client().post(
+            base_url + '/categories/1/recipes/', data=json.dumps(recipes),
+            headers=dict(Authorization=self.access_token), content_type='application/json')
+        self.assertEqual(create_recipes.status_code, 201)
+        result = json.loads(create_recipes.data.decode())
+        self.assertEqual([item['status'] for item in result['results']], ['success', 'fail'])
+        self.assertEqual(result['results'][1]['message'],
+                         'Recipe values cannot be longer than 256 characters')
+
+    def test_to_create_recipes_in_bulk_in_a_missing_category(self):
+        """Method to check that bulk creation needs an existing category of the user
+        """
+        create_recipes = self.client().post(
+            base_url + '/categories/7/recipes/', data=json.dumps([self.recipes]),
+            headers=dict(Authorization=self.access_token), content_type='application/json')
+        self.assertEqual(create_recipes.status_code, 404)
+
+    def test_to_edit_and_delete_recipes_in_bulk(self):
+        """Method to check the bulk recipe update and delete of a category
+        """
+        self.client().post(base_url + '/categories/1/recipes/', data=json.dumps(
+            [self.recipes, self.other_recipes]), headers=dict(Authorization=self.access_token),
+                           content_type='application/json')
+        edit_recipes = self.client().put(
+            base_url + '/categories/1/recipes/bulk', data=json.dumps(
+                {'q': 'another', 'recipe_methods': 'Serve cold'}),
+            headers=dict(Authorization=self.access_token), content_type='application/json')
+        self.assertEqual(edit_recipes.status_code, 200)
+        self.assertEqual(json.loads(edit_recipes.data.decode())['ids'], [2])
+        get_recipe = self.client().get(base_url + '/categories/1/recipes/2',
+                                       headers=dict(Authorization=self.access_token))
+        self.assertIn('Serve cold', str(get_recipe.data))
+
+        delete_recipes = self.client().delete(
+            base_url + '/categories/1/recipes/bulk', data=json.dumps({'ids': [1, 2]}),
+            headers=dict(Authorization=self.access_token), content_type='application/json')
+        self.assertEqual(json.loads(delete_recipes.data.decode())['ids'], [1, 2])
+        with self.app.app_context():
+            self.assertEqual(Categories.query.get(1).recipe_count, 0)
+            self.assertEqual(User.query.get(1).recipe_count, 0)
+
+    def test_to_delete_recipes_in_bulk_by_a_wildcard_search(self):
+        """Method to check that LIKE wildcards in a bulk search only match themselves
+        """
+        self.client().post(base_url + '/categories/1/recipes/', data=json.dumps(
+            [self.recipes, self.other_recipes]), headers=dict(Authorization=self.access_token),
+                           content_type='application/json')
+        for search in ('%', '_e'):
+            delete_recipes = self.client().delete(
+                base_url + '/categories/1/recipes/bulk', data=json.dumps({'q': search}),
+                headers=dict(Authorization=self.access_token), content_type='application/json')
+            self.assertEqual(json.loads(delete_recipes.data.decode())['ids'], [])
+        with self.app.app_context():
+            self.assertEqual(Categories.query.get(1).recipe_count, 2)
+
+    def test_to_edit_recipes_in_bulk_with_values_not_valid(self):
+        """Method to check that blank or over-long bulk values are refused with 400
+        """
+        self.client().post(base_url + '/categories/1/recipes/',
+                           headers=dict(Authorization=self.access_token), data=self.recipes)
+        for values in ({'recipe_methods': ' \t '}, {'recipe_ingredients': 'milk, ' * 60}, {}):
+            edit_recipes = self.client().put(
+                base_url + '/categories/1/recipes/bulk', data=json.dumps(dict(values, ids=[1])),
+                headers=dict(Authorization=self.access_token), content_type='application/json')
+            self.assertEqual(edit_recipes.status_code, 400)
+
+    def test_to_export_the_cookbook_as_ndjson(self):
+        """Method to check the streamed export nests recipes in their category
+        """
+        self.client().post(base_url + '/categories/1/recipes/', data=json.dumps(
+            [self.recipes, self.other_recipes]), headers=dict(Authorization=self.access_token),
+                           content_type='application/json')
+        self.client().post(base_url + '/categories/', headers=dict(
+            Authorization=self.access_token), data={'category_name': 'Empty'})
+        export = self.client().get(base_url + '/export',
+                                   headers=dict(Authorization=self.access_token))
+        self.assertEqual(export.status_code, 200)
+        self.assertEqual(export.mimetype, 'application/x-ndjson')
+        lines = [json.loads(line) for line in export.data.decode().splitlines()]
+        self.assertEqual([line['category_name'] for line in lines], ['New_Category', 'Empty'])
+        self.assertEqual([recipe['recipe_name'] for recipe in lines[0]['recipes']],
+                         ['New_Recipes', 'Another_New_Recipes'])
+        self.assertEqual(lines[1]['recipes'], [])
+
+    def test_to_export_the_cookbook_as_csv(self):
+        """Method to check the flat CSV export and that nested CSV is refused
+        """
+        self.client().post(base_url + '/categories/1/recipes/',
+                           headers=dict(Authorization=self.access_token), data=self.recipes)
+        export = self.client().get(base_url + '/export?format=csv',
+                                   headers=dict(Authorization=self.access_token))
+        self.assertEqual(export.status_code, 200)
+        lines = export.data.decode().splitlines()
+        self.assertTrue(lines[0].startswith('category_id,category_name,recipe_id,recipe_name'))
+        self.assertTrue(lines[1].startswith('1,New_Category,1,New_Recipes,milk,boil to heat'))
+
+        export = self.client().get(base_url + '/export?format=csv&layout=nested',
+                                   headers=dict(Authorization=self.access_token))
+        self.assertEqual(export.status_code, 400)
+
+    def test_to_import_a_cookbook_from_ndjson(self):
+        """Method to check that an import saves the valid records and reports
+        the lines that failed
+        """
+        self.client().post(base_url + '/categories/1/recipes/',
+                           headers=dict(Authorization=self.access_token), data=self.recipes)
+        upload = '\n'.join([
+            json.dumps({'category_name': 'New_Category',
+                        'recipes': [self.recipes, self.other_recipes]}),
+            'not json',
+            json.dumps({'category_name': 'Supper',
+                        'recipes': [{'recipe_name': 'Soup', 'recipe_ingredients': 'Water',
+                                     'recipe_methods': 'Boil'},
+                                    {'recipe_name': '', 'recipe_ingredients': 'Water',
+                                     'recipe_methods': 'Boil'}]}),
+            json.dumps({'category_name': '', 'recipes': []})])
+        import_result = self.client().post(base_url + '/import', data=upload,
+                                           headers=dict(Authorization=self.access_token),
+                                           content_type='application/x-ndjson')
+        self.assertEqual(import_result.status_code, 200)
+        report = json.loads(import_result.data.decode())
+        self.assertEqual((report['categories'], report['recipes'], report['failed']), (1, 2, 4))
+        self.assertEqual([(error['line'], error.get('recipe')) for error in report['errors']],
+                         [(2, None), (3, 1), (4, None), (1, 0)])
+        with self.app.app_context():
+            self.assertEqual(Categories.query.get(1).recipe_count, 2)
+            self.assertEqual(User.query.get(1).recipe_count, 3)
+            self.assertEqual(User.query.get(1).category_count, 2)
+
+    def test_to_import_an_exported_csv_file(self):
+        """Method to check that a CSV export can be uploaded again as a file
+        """
+        self.client().post(base_url + '/categories/1/recipes/',
+                           headers=dict(Authorization=self.access_token), data=self.recipes)
+        export = self.client().get(base_url + '/export?format=csv',
+                                   headers=dict(Authorization=self.access_token))
+        upload = export.data.replace(b'New_Category', b'Copied_Category')
+        import_result = self.client().post(
+            base_url + '/import?format=csv', headers=dict(Authorization=self.access_token),
+            data={'file': (io.BytesIO(upload), 'cookbook.csv')},
+            content_type='multipart/form-data')
+        report = json.loads(import_result.data.decode())
+        self.assertEqual((report['categories'], report['recipes'], report['failed']), (1, 1, 0))
+        get_recipe = self.client().get(base_url + '/categories/2/recipes/2',
+                                       headers=dict(Authorization=self.access_token))
+        self.assertIn('New_Recipes', str(get_recipe.data))
+
+    def test_to_get_recipes_with_selected_fields(self):
+        """Method to check that only the requested recipe fields are loaded and returned
+        """
+        self.client().post(base_url + '/categories/1/recipes/',
+                           headers=dict(Authorization=self.access_token), data=self.recipes)
+        statements = []
+
+        def record_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', record_statement)
+            try:
+                get_recipes = self.client().get(
+                    base_url + '/categories/1/recipes/?fields=id,recipe_name',
+                    headers=dict(Authorization=self.access_token))
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', record_statement)
+        self.assertEqual(get_recipes.status_code, 200)
+        recipe_data = json.loads(get_recipes.data.decode())
+        self.assertEqual(recipe_data[0]['recipe_name'], 'New_Recipes')
+        self.assertNotIn('recipe_methods', recipe_data[0])
+        self.assertFalse([statement for statement in statements
+                          if 'recipes.recipe_methods' in statement])
+
+    def test_to_get_unchanged_recipe_with_if_none_match(self):
+        """Method to check that an unchanged recipe is answered with 304 Not Modified
+        """
+        self.client().post(base_url + '/categories/1/recipes/',
+                           headers=dict(Authorization=self.access_token), data=self.recipes)
+        get_recipe = self.client().get(base_url + '/categories/1/recipes/1',
+                                       headers=dict(Authorization=self.access_token))
+        get_recipe = self.client().get(base_url + '/categories/1/recipes/1', headers={
+            'Authorization': self.access_token, 'If-None-Match': get_recipe.headers['ETag']})
+        self.assertEqual(get_recipe.status_code, 304)
+
+    def test_to_edit_recipe_with_stale_if_match(self):
+        """Method to check that an edit based on an outdated recipe is refused with 412
+        """
+        self.client().post(base_url + '/categories/1/recipes/',
+                           headers=dict(Authorization=self.access_token), data=self.recipes)
+        get_recipe = self.client().get(base_url + '/categories/1/recipes/1',
+                                       headers=dict(Authorization=self.access_token))
+        etag = get_recipe.headers['ETag']
+        edited_recipe = {'recipe_name': 'edited_recipe_name',
+                         'recipe_ingredients': 'milk, milk',
+                         'recipe_methods': 'boil to heat'}
+        edit_recipe = self.client().put(base_url + '/categories/1/recipes/1', headers={
+            'Authorization': self.access_token, 'If-Match': etag}, data=edited_recipe)
+        self.assertEqual(edit_recipe.status_code, 201)
+        edit_recipe = self.client().put(base_url + '/categories/1/recipes/1', headers={
+            'Authorization': self.access_token, 'If-Match': etag}, data=edited_recipe)
+        self.assertEqual(edit_recipe.status_code, 412)
+
+    def test_to_edit_recipe_with_the_etag_of_a_partial_get(self):
+        """Method to check that the ETag of a ?fields= GET is accepted as If-Match
+        """
+        self.client().post(base_url + '/categories/1/recipes/',
+                           headers=dict(Authorization=self.access_token), data=self.recipes)
+        get_recipe = self.client().get(base_url + '/categories/1/recipes/1?fields=id,recipe_name',
+                                       headers=dict(Authorization=self.access_token))
+        edit_recipe = self.client().put(base_url + '/categories/1/recipes/1', headers={
+            'Authorization': self.access_token, 'If-Match': get_recipe.headers['ETag']},
+                                        data=dict(self.recipes, recipe_methods='simmer'))
+        self.assertEqual(edit_recipe.status_code, 201)
+
+    def test_to_get_recipe_with_unknown_field(self):
+        """Method to check that unknown fields are refused
+        """
+        self.client().post(base_url + '/categories/1/recipes/',
+                           headers=dict(Authorization=self.access_token), data=self.recipes)
+        get_recipe = self.client().get(base_url + '/categories/1/recipes/1?fields=id,password',
+                                       headers=dict(Authorization=self.access_token))
+        self.assertEqual(get_recipe.status_code, 400)
+
     def test_to_check_recipe_search_success(self):
         """ Method to check for success in searching for a recipe item
         """
@@ -369,6 +659,223 @@ class RecipesTestCase(unittest.TestCase):
             headers=dict(Authorization=self.access_token))
         self.assertEqual(get_created_recipe.status_code, 200)
 
+    def test_to_search_recipes_by_ingredients_and_methods_with_ranking(self):
+        """ Method to check that search matches ingredients and methods too
+        and returns matching names first
+        """
+        self.client().post(base_url + '/categories/1/recipes/', data=json.dumps([
+            {'recipe_name': 'Tea', 'recipe_ingredients': 'Water, Ginger',
+             'recipe_methods': 'Boil'},
+            {'recipe_name': 'Ginger Soup', 'recipe_ingredients': 'Ginger, Water',
+             'recipe_methods': 'Simmer'},
+            {'recipe_name': 'Juice', 'recipe_ingredients': 'Oranges',
+             'recipe_methods': 'Press'}]), headers=dict(Authorization=self.access_token),
+                           content_type='application/json')
+        search_recipe = self.client().get(base_url + '/categories/1/recipes/search/?q=ginge',
+                                          headers=dict(Authorization=self.access_token))
+        self.assertEqual([recipe['recipe_name'] for recipe in
+                          json.loads(search_recipe.data.decode())], ['Ginger Soup', 'Tea'])
+
+        search_recipe = self.client().get(base_url + '/categories/1/recipes/search/?q=simmered',
+                                          headers=dict(Authorization=self.access_token))
+        self.assertEqual([recipe['recipe_name'] for recipe in
+                          json.loads(search_recipe.data.decode())], ['Ginger Soup'])
+
+    def test_to_search_recipes_with_punctuation_only(self):
+        """ Method to check that a search without any word finds no recipes
+        """
+        self.client().post(base_url + '/categories/1/recipes/',
+                           headers=dict(Authorization=self.access_token), data=self.recipes)
+        for url in ('/categories/1/recipes/search/?q=!!', '/recipes/search/?q=!!'):
+            search_recipe = self.client().get(base_url + url,
+                                              headers=dict(Authorization=self.access_token))
+            self.assertEqual(search_recipe.status_code, 200)
+            self.assertEqual(json.loads(search_recipe.data.decode()), [])
+
+    def test_to_search_recipes_of_all_categories_with_facets(self):
+        """ Method to check one search over every category of a user, with
+        the matches counted per category
+        """
+        self.client().post(base_url + '/categories/', headers=dict(Authorization=self.access_token),
+                           data={'category_name': 'Drinks'})
+        self.client().post(base_url + '/categories/1/recipes/',
+                           headers=dict(Authorization=self.access_token), data=self.recipes)
+        self.client().post(base_url + '/categories/2/recipes/',
+                           headers=dict(Authorization=self.access_token), data=self.other_recipes)
+        self.client().post(base_url + '/categories/2/recipes/',
+                           headers=dict(Authorization=self.access_token),
+                           data={'recipe_name': 'Milkshake', 'recipe_ingredients': 'milk',
+                                 'recipe_methods': 'blend'})
+
+        for backend in ('postgres', 'memory'):
+            self.app.config['SEARCH_BACKEND'] = backend
+            search_index.configure(backend == 'memory', 16)
+            search_recipe = self.client().get(
+                'yummy_api/v2/recipes/search/?q=milk&facets=category&after=&limit=2',
+                headers=dict(Authorization=self.access_token))
+            self.assertEqual(search_recipe.status_code, 200)
+            result = json.loads(search_recipe.data.decode())
+            self.assertEqual([recipe['id'] for recipe in result['items']], [1, 2])
+            self.assertEqual(result['facets'], {'total': 3, 'categories': [
+                {'category_id': 2, 'category_name': 'Drinks', 'count': 2},
+                {'category_id': 1, 'category_name': 'New_Category', 'count': 1}]})
+            search_recipe = self.client().get(
+                'yummy_api/v2/recipes/search/?q=milk&after={}&limit=2'.format(
+                    result['page']['next_cursor']),
+                headers=dict(Authorization=self.access_token))
+            self.assertEqual([recipe['recipe_name'] for recipe in
+                              json.loads(search_recipe.data.decode())['items']], ['Milkshake'])
+
+        facets_in_v1 = self.client().get(base_url + '/recipes/search/?q=milk&facets=category',
+                                         headers=dict(Authorization=self.access_token))
+        self.assertEqual(facets_in_v1.status_code, 400)
+
+    def test_to_search_recipes_with_date_facets(self):
+        """ Method to check the category and date facets counted with one grouped query
+        """
+        self.client().post(base_url + '/categories/1/recipes/',
+                           headers=dict(Authorization=self.access_token), data=self.recipes)
+        self.client().post(base_url + '/categories/1/recipes/',
+                           headers=dict(Authorization=self.access_token), data=self.other_recipes)
+        statements = []
+
+        def record_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', record_statement)
+            try:
+                search_recipe = self.client().get(
+                    'yummy_api/v2/categories/1/recipes/search/?q=milk&facets=category,date'
+                    '&date_bucket=year', headers=dict(Authorization=self.access_token))
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', record_statement)
+        facets = json.loads(search_recipe.data.decode())['facets']
+        self.assertEqual((facets['total'], facets['categories'][0]['count']), (2, 2))
+        self.assertEqual([facet['count'] for facet in facets['dates']], [2])
+        self.assertEqual(len([statement for statement in statements
+                              if 'GROUPING SETS' in statement]), 1)
+
+        bad_bucket = self.client().get(
+            'yummy_api/v2/recipes/search/?q=milk&facets=date&date_bucket=hour',
+            headers=dict(Authorization=self.access_token))
+        self.assertEqual(bad_bucket.status_code, 400)
+
+    def test_to_search_recipes_in_a_category_of_another_user(self):
+        """ Method to check that a category search needs a category of the user
+        """
+        self.client().post(base_url + '/auth/register', data=json.dumps({
+            'email': 'other@test.com', 'password': 'password', 'username': 'Other',
+            'secret_word': 'TOP SECRET'}), content_type='application/json')
+        other_token = json.loads(self.client().post(
+            base_url + '/auth/login', data=json.dumps({
+                'email': 'other@test.com', 'password': 'password'}),
+            content_type='application/json').data.decode())['access_token']
+        create_category = self.client().post(base_url + '/categories/',
+                                             headers=dict(Authorization=other_token),
+                                             data={'category_name': 'Other_Category'})
+        other_category = json.loads(create_category.data.decode())['id']
+        self.client().post(base_url + '/categories/{}/recipes/'.format(other_category),
+                           headers=dict(Authorization=other_token), data=self.recipes)
+
+        search_recipe = self.client().get(
+            base_url + '/categories/{}/recipes/search/?q=milk'.format(other_category),
+            headers=dict(Authorization=other_token))
+        self.assertEqual(search_recipe.status_code, 200)
+        search_recipe = self.client().get(
+            base_url + '/categories/{}/recipes/search/?q=milk'.format(other_category),
+            headers=dict(Authorization=self.access_token))
+        self.assertEqual(search_recipe.status_code, 404)
+
+    def test_to_search_recipes_with_the_in_process_index(self):
+        """ Method to check the in-process search backend and that writes
+        update it in place
+        """
+        self.app.config['SEARCH_BACKEND'] = 'memory'
+        search_index.configure(True, 16)
+        self.client().post(base_url + '/categories/1/recipes/', data=json.dumps([
+            {'recipe_name': 'Tea', 'recipe_ingredients': 'Water, Ginger',
+             'recipe_methods': 'Boil'},
+            {'recipe_name': 'Ginger Soup', 'recipe_ingredients': 'Ginger, Ginger root',
+             'recipe_methods': 'Simmer'}]), headers=dict(Authorization=self.access_token),
+                           content_type='application/json')
+        search_recipe = self.client().get(base_url + '/categories/1/recipes/search/?q=ging',
+                                          headers=dict(Authorization=self.access_token))
+        self.assertEqual([recipe['recipe_name'] for recipe in
+                          json.loads(search_recipe.data.decode())], ['Ginger Soup', 'Tea'])
+
+        self.client().put(base_url + '/categories/1/recipes/1',
+                          headers=dict(Authorization=self.access_token),
+                          data={'recipe_name': 'Tea', 'recipe_ingredients': 'Water, Mint',
+                                'recipe_methods': 'Boil'})
+        search_recipe = self.client().get(base_url + '/categories/1/recipes/search/?q=ging',
+                                          headers=dict(Authorization=self.access_token))
+        self.assertEqual([recipe['recipe_name'] for recipe in
+                          json.loads(search_recipe.data.decode())], ['Ginger Soup'])
+        self.assertEqual((search_index.stats()['builds'], search_index.stats()['updates']),
+                         (1, 1))
+
+        self.client().delete(base_url + '/categories/1/recipes/bulk',
+                             data=json.dumps({'ids': [2]}), content_type='application/json',
+                             headers=dict(Authorization=self.access_token))
+        search_recipe = self.client().get(base_url + '/categories/1/recipes/search/?q=ging',
+                                          headers=dict(Authorization=self.access_token))
+        self.assertEqual(json.loads(search_recipe.data.decode()), [])
+        self.assertEqual(search_index.stats()['builds'], 2)
+
+    def test_to_restore_the_in_process_index_from_a_snapshot(self):
+        """ Method to check that a restored snapshot is searched without a rebuild
+        """
+        self.app.config['SEARCH_BACKEND'] = 'memory'
+        search_index.configure(True, 16)
+        self.client().post(base_url + '/categories/1/recipes/',
+                           headers=dict(Authorization=self.access_token), data=self.recipes)
+        handle, path = tempfile.mkstemp(suffix='.gz')
+        os.close(handle)
+        try:
+            with self.app.app_context():
+                self.assertEqual(search_index.snapshot(path, [1]), 1)
+            search_index.configure(True, 16)
+            self.assertEqual(search_index.restore(path), 1)
+        finally:
+            os.remove(path)
+        search_category = self.client().get(base_url + '/categories/search/?q=new_cat',
+                                            headers=dict(Authorization=self.access_token))
+        self.assertEqual(json.loads(search_category.data.decode())[0]['category_name'],
+                         'New_Category')
+        search_recipe = self.client().get(base_url + '/categories/1/recipes/search/?q=boil',
+                                          headers=dict(Authorization=self.access_token))
+        self.assertEqual(json.loads(search_recipe.data.decode())[0]['recipe_name'],
+                         'New_Recipes')
+        self.assertEqual(search_index.stats()['builds'], 0)
+
+    def test_to_check_cursor_paginated_recipe_search(self):
+        """ Method to check paging through recipe search results with cursors
+        """
+        create_recipe = self.client().post(base_url + '/categories/1/recipes/',
+                                           headers=dict(Authorization=self.access_token),
+                                           data=self.recipes)
+        self.assertEqual(create_recipe.status_code, 201)
+        create_another_recipe = self.client().post(base_url + '/categories/1/recipes/',
+                                                   headers=dict(Authorization=self.access_token),
+                                                   data=self.other_recipes)
+        self.assertEqual(create_another_recipe.status_code, 201)
+
+        search_recipe = self.client().get(
+            base_url + '/categories/1/recipes/search/?q=New&after=&limit=1',
+            headers=dict(Authorization=self.access_token))
+        recipe_data = json.loads(search_recipe.data.decode())
+        self.assertEqual(search_recipe.status_code, 200)
+        self.assertEqual(recipe_data[0]['recipe_name'], 'New_Recipes')
+
+        search_recipe = self.client().get(
+            base_url + '/categories/1/recipes/search/?q=New&limit=1&after={}'.format(
+                recipe_data[0]['next_cursor']),
+            headers=dict(Authorization=self.access_token))
+        recipe_data = json.loads(search_recipe.data.decode())
+        self.assertEqual(recipe_data[0]['recipe_name'], 'Another_New_Recipes')
+        self.assertIsNone(recipe_data[0]['next_cursor'])
+
     def test_to_check_for_null_item_provided_for_search(self):
         """ Method to check for no recipe search item provided
         """
@@ -386,6 +893,108 @@ class RecipesTestCase(unittest.TestCase):
             headers=dict(Authorization=self.access_token))
         self.assertEqual(get_created_recipe.status_code, 200)
 
+    def test_to_find_recipes_by_ingredients(self):
+        """ Method to check finding recipes listing all or any of some ingredients
+        """
+        self.client().post(base_url + '/categories/1/recipes/',
+                           headers=dict(Authorization=self.access_token), data=self.recipes)
+        self.client().post(base_url + '/categories/1/recipes/',
+                           headers=dict(Authorization=self.access_token), data=self.other_recipes)
+
+        find_all = self.client().get(base_url + '/recipes/ingredients/?ingredients=milk,%20WATER',
+                                     headers=dict(Authorization=self.access_token))
+        self.assertEqual(find_all.status_code, 200)
+        self.assertEqual([recipe['recipe_name'] for recipe in json.loads(find_all.data.decode())],
+                         ['Another_New_Recipes'])
+        find_any = self.client().get(
+            base_url + '/recipes/ingredients/?ingredients=milk,water&match=any',
+            headers=dict(Authorization=self.access_token))
+        self.assertEqual(len(json.loads(find_any.data.decode())), 2)
+
+        self.client().put(base_url + '/categories/1/recipes/1',
+                          headers=dict(Authorization=self.access_token),
+                          data=dict(self.recipes, recipe_ingredients='water; sugar'))
+        find_milk = self.client().get(base_url + '/recipes/ingredients/?ingredients=milk',
+                                      headers=dict(Authorization=self.access_token))
+        self.assertEqual([recipe['recipe_name'] for recipe in json.loads(find_milk.data.decode())],
+                         ['Another_New_Recipes'])
+        self.client().delete(base_url + '/categories/1/recipes/2',
+                             headers=dict(Authorization=self.access_token))
+        find_milk = self.client().get(base_url + '/recipes/ingredients/?ingredients=milk',
+                                      headers=dict(Authorization=self.access_token))
+        self.assertEqual(json.loads(find_milk.data.decode()), [])
+
+    def test_to_find_recipes_without_ingredients(self):
+        """ Method to check the ingredients and match of an ingredient query
+        """
+        no_ingredients = self.client().get(base_url + '/recipes/ingredients/?ingredients=,',
+                                           headers=dict(Authorization=self.access_token))
+        self.assertEqual(no_ingredients.status_code, 400)
+        bad_match = self.client().get(
+            base_url + '/recipes/ingredients/?ingredients=milk&match=some',
+            headers=dict(Authorization=self.access_token))
+        self.assertEqual(bad_match.status_code, 400)
+
+    def test_to_find_recipes_a_pantry_can_cook(self):
+        """ Method to check pantry results ranked by missing ingredients and
+        kept up to date by recipe writes
+        """
+        self.client().post(base_url + '/categories/1/recipes/',
+                           headers=dict(Authorization=self.access_token), data=self.recipes)
+        self.client().post(base_url + '/categories/1/recipes/',
+                           headers=dict(Authorization=self.access_token), data=self.other_recipes)
+
+        pantry = self.client().get(base_url + '/recipes/pantry/?ingredients=Milk',
+                                   headers=dict(Authorization=self.access_token))
+        self.assertEqual(pantry.status_code, 200)
+        self.assertEqual([(recipe['recipe_name'], recipe['missing_ingredients'])
+                          for recipe in json.loads(pantry.data.decode())],
+                         [('New_Recipes', []), ('Another_New_Recipes', ['water'])])
+        cookable = self.client().get(base_url + '/recipes/pantry/?ingredients=milk&max_missing=0',
+                                     headers=dict(Authorization=self.access_token))
+        self.assertEqual([recipe['recipe_name'] for recipe in json.loads(cookable.data.decode())],
+                         ['New_Recipes'])
+
+        self.client().delete(base_url + '/categories/1/recipes/1',
+                             headers=dict(Authorization=self.access_token))
+        cookable = self.client().get(base_url + '/recipes/pantry/?ingredients=milk,water',
+                                     headers=dict(Authorization=self.access_token))
+        self.assertEqual([recipe['recipe_name'] for recipe in json.loads(cookable.data.decode())],
+                         ['Another_New_Recipes'])
+        self.assertEqual((pantry_index.stats()['builds'], pantry_index.stats()['updates']), (1, 1))
+
+    def test_to_find_recipes_a_pantry_can_cook_among_many(self):
+        """ Method to check pantry results once common ingredients are kept as bit arrays
+        """
+        recipes = [{'recipe_name': 'Recipe{}'.format(number),
+                    'recipe_ingredients': 'milk, water' if number % 3 else 'milk, sugar, salt',
+                    'recipe_methods': 'boil'} for number in range(150)]
+        self.client().post(base_url + '/categories/1/recipes/', data=json.dumps(recipes),
+                           headers=dict(Authorization=self.access_token),
+                           content_type='application/json')
+        cookable = self.client().get(
+            base_url + '/recipes/pantry/?ingredients=milk,sugar,salt&max_missing=1&limit=100',
+            headers=dict(Authorization=self.access_token))
+        results = json.loads(cookable.data.decode())
+        self.assertEqual(len(results), 100)
+        self.assertEqual([recipe['missing_ingredients'] for recipe in results[:50]],
+                         [[]] * 50)
+        self.assertEqual(results[50]['missing_ingredients'], ['water'])
+        self.assertEqual(results[0]['next_Page'], 2)
+
+    def test_to_find_recipes_with_an_empty_pantry(self):
+        """ Method to check that a pantry query needs ingredients and a
+        whole max_missing
+        """
+        pantry = self.client().get(base_url + '/recipes/pantry/?ingredients=',
+                                   headers=dict(Authorization=self.access_token))
+        self.assertEqual(pantry.status_code, 400)
+        for max_missing in ('abc', '-1', '1.5'):
+            pantry = self.client().get(
+                base_url + '/recipes/pantry/?ingredients=milk&max_missing=' + max_missing,
+                headers=dict(Authorization=self.access_token))
+            self.assertEqual(pantry.status_code, 400)
+
     def tearDown(self):
         """teardown all initialized variables."""
         with self.app.app_context():